@@ -19,6 +19,8 @@
     DATA_PATH=""
     OUTPUT_PATH=""
     CONFIG_PATH=""
+    PATTERN="*.csv"
+    WORKERS=""
     
     while [[ $# -gt 0 ]]; do
       case $1 in
@@ -34,6 +36,14 @@
           CONFIG_PATH="$2"
           shift 2
           ;;
+        --pattern)
+          PATTERN="$2"
+          shift 2
+          ;;
+        --workers)
+          WORKERS="$2"
+          shift 2
+          ;;
         *)
           echo "Unknown option: $1"
           exit 1
@@ -43,7 +53,7 @@
     
     # Check required arguments
     if [ -z "$DATA_PATH" ]; then
-      echo "Usage: validate-data-${config.name} --data-path <path> [--output-path <path>] [--config <path>]"
+      echo "Usage: validate-data-${config.name} --data-path <path|dir|glob> [--output-path <path>] [--config <path>] [--pattern <glob>] [--workers <n>]"
       exit 1
     fi
     
@@ -72,7 +82,9 @@
       ${pkgs.python3.withPackages (ps: with ps; [ great-expectations pandas ])}/bin/python ${root.utils.dataValidationScripts}/great_expectations_validator.py \
         --data-path "$DATA_PATH" \
         --output-path "$OUTPUT_PATH" \
-        --config "$CONFIG_FILE"
+        --config "$CONFIG_FILE" \
+        --pattern "$PATTERN" \
+        ''${WORKERS:+--workers "$WORKERS"}
     elif [ "${config.type}" == "deequ" ]; then
       ${pkgs.jre}/bin/java -jar ${root.utils.dataValidationScripts}/deequ-validator.jar \
         --data-path "$DATA_PATH" \
@@ -157,7 +169,16 @@
       --data-path <path-to-data> \
       --output-path <path-to-save-results> \
       --config <optional-config-file>
+
+    # Validate every CSV under a directory (or a quoted glob) across a process pool
+    nix run .#validate-data-${config.name} -- \
+      --data-path <dataset-dir> \
+      --pattern "*.csv" \
+      --workers 8
     ```
+
+    Multi-file runs write a combined `validation_result.json` with wall-clock and
+    rows/sec statistics, plus one result per file under `files/`.
   '';
   
   # Create documentation derivation
@@ -16,6 +16,8 @@ config: let
     INPUT_FILE=""
     OUTPUT_FILE=""
     MODE="encode"
+    MATRIX_ARGS=()
+    PROFILE_ARGS=()
     
     while [[ $# -gt 0 ]]; do
       case $1 in
@@ -31,6 +33,18 @@ config: let
           MODE="$2"
           shift 2
           ;;
+        --input2|--top-k|--threshold|--block-size|--batch-size)
+          MATRIX_ARGS+=("$1" "$2")
+          shift 2
+          ;;
+        --profile|--profile-memory|--profile-cprofile)
+          PROFILE_ARGS+=("$1")
+          shift
+          ;;
+        --profile-output)
+          PROFILE_ARGS+=("$1" "$2")
+          shift 2
+          ;;
         *)
           echo "Unknown option: $1"
           exit 1
@@ -69,7 +83,9 @@ config: let
       --input "$INPUT_FILE" \
       --output "$OUTPUT_FILE" \
       --config "$CONFIG_FILE" \
-      --mode "$MODE"
+      --mode "$MODE" \
+      "''${MATRIX_ARGS[@]}" \
+      "''${PROFILE_ARGS[@]}"
     
     # Output results
     if [ -n "$REMOVE_OUTPUT" ]; then
@@ -149,6 +165,31 @@ config: let
     nix run .#run-embeddingServices-${config.meta.name} -- --input input.txt --output embeddings.json --mode encode
     ```
     
+    ### Similarity across sets of texts
+
+    ```bash
+    # Top 10 neighbours of every line in queries.txt among corpus.txt (JSON lines)
+    nix run .#run-embeddingServices-${config.meta.name} -- --mode matrix \
+      --input queries.txt --input2 corpus.txt --top-k 10 --output neighbours.jsonl
+
+    # All pairs within corpus.txt with similarity >= 0.9, as an edge list
+    nix run .#run-embeddingServices-${config.meta.name} -- --mode matrix \
+      --input corpus.txt --threshold 0.9 --output edges.jsonl
+    ```
+
+    Texts are encoded in batches (`--batch-size`), and similarities are
+    computed in `--block-size` tiles, so the full N x M matrix is never held in
+    memory.
+
+    ### Profile a run
+
+    ```bash
+    # Per-phase wall/CPU time (import, model load, encode, write) and peak RSS go
+    # to <output>.profile.json; add --profile-cprofile for a .prof dump, or
+    # --profile-memory for tracemalloc peaks and top allocation sites (slower)
+    nix run .#run-embeddingServices-${config.meta.name} -- --input input.txt --output embeddings.json --mode encode --profile
+    ```
+
     ### Start as a service
     
     ```bash
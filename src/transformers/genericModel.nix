@@ -15,6 +15,7 @@ config: let
     # Parse arguments
     INPUT_FILE=""
     OUTPUT_FILE=""
+    PROFILE_ARGS=()
 
     while [[ $# -gt 0 ]]; do
       case $1 in
@@ -26,6 +27,14 @@ config: let
           OUTPUT_FILE="$2"
           shift 2
           ;;
+        --profile|--profile-memory|--profile-cprofile)
+          PROFILE_ARGS+=("$1")
+          shift
+          ;;
+        --profile-output)
+          PROFILE_ARGS+=("$1" "$2")
+          shift 2
+          ;;
         *)
           echo "Unknown option: $1"
           exit 1
@@ -64,7 +73,8 @@ config: let
         --task "${kind}" \
         --input "$INPUT_FILE" \
         --output "$OUTPUT_FILE" \
-        --config "$CONFIG_FILE"
+        --config "$CONFIG_FILE" \
+        "''${PROFILE_ARGS[@]}"
     '' else if config.framework == "tensorflow" then ''
       ${pkgs.python3.withPackages (ps: with ps; [
         tensorflow numpy
@@ -135,14 +145,16 @@ config: let
 
     # Run the service based on framework
     ${pkgs.python3.withPackages (ps: with ps; [
-      fastapi uvicorn transformers torch tensorflow onnx onnxruntime numpy
+      fastapi uvicorn transformers torch tensorflow onnx onnxruntime numpy threadpoolctl
     ])}/bin/python ${root.utils.modelService}/service.py \
       --model-uri "${config.model-uri}" \
       --framework "${config.framework}" \
       --task "${kind}" \
       --host "${config.service.host}" \
       --port "${toString config.service.port}" \
-      --config "$CONFIG_FILE"
+      --config "$CONFIG_FILE" \
+      ${l.optionalString (config.service.serverTiming or false) "--server-timing"} \
+      --workers "${toString (config.service.workers or 1)}"
 
     # Clean up
     rm "$CONFIG_FILE"
@@ -174,6 +186,9 @@ config: let
 
     # Process text from file
     nix run .#${cliPrefix}-${kind}-${config.meta.name} -- --input input.txt --output result.txt
+
+    # Profile the run (import, model load, inference, write) into result.txt.profile.json
+    nix run .#${cliPrefix}-${kind}-${config.meta.name} -- --input input.txt --output result.txt --profile
     ```
 
     ${if config.service.enable then ''
@@ -13,6 +13,8 @@ config: let
       sources = config.sources;
       processors = config.processors;
       embedder = config.embedder;
+    } // l.optionalAttrs (config ? sinks) {
+      sinks = config.sinks;
     };
   };
 
@@ -26,19 +28,21 @@ config: let
     # Default output directory
     OUTPUT_DIR="${config.output-dir or "$HOME/.local/share/vector-store/${config.collection}"}"
 
-    # Allow overriding output directory
-    if [ $# -ge 1 ]; then
+    # Allow overriding output directory; remaining options (e.g. --profile) go to the ingestor
+    if [ $# -ge 1 ] && [[ "$1" != --* ]]; then
       OUTPUT_DIR="$1"
+      shift
     fi
 
     echo "Output directory: $OUTPUT_DIR"
 
     # Run the ingestor
     ${pkgs.python3.withPackages (ps: with ps; [
-      numpy sentence-transformers
+      numpy sentence-transformers httpx
     ])}/bin/python ${root.utils.vectorIngest}/ingestor.py \
       --config ${configJson} \
-      --output-dir "$OUTPUT_DIR"
+      --output-dir "$OUTPUT_DIR" \
+      "$@"
   '';
 
   # Create documentation
@@ -63,6 +67,13 @@ config: let
     '' else if source.type == "web" then ''
     - URLs: ${l.concatStringsSep ", " source.urls}
     - Depth: ${toString source.depth}
+    - Concurrency: ${toString (source.concurrency or 16)} requests (${toString (source.per_host_concurrency or 8)} per host)
+    ${l.optionalString (source ? include_patterns) "- Include: ${l.concatStringsSep ", " source.include_patterns}"}
+    ${l.optionalString (source ? exclude_patterns) "- Exclude: ${l.concatStringsSep ", " source.exclude_patterns}"}
+
+    Pages are re-requested with their cached ETag/Last-Modified validators
+    (kept in `${source.cache_dir or "$OUTPUT_DIR/.crawl-cache"}`), so unchanged
+    pages are not downloaded again.
     '' else ''
     - Custom source type
     ''}
@@ -75,10 +86,24 @@ config: let
     ### ${processor.type}
 
     ${if processor.type == "text_splitter" then ''
-    - Chunk size: ${toString processor.chunk_size}
-    - Chunk overlap: ${toString processor.chunk_overlap}
+    - Splitter: ${processor.splitter or "lines"}
+    ${if (processor.splitter or "") == "tokens" || (processor.length or "") == "tokens" then ''
+    - Chunk size: ${toString (processor.chunk_size or "model max sequence length")} tokens
+    '' else ''
+    - Chunk size: ${toString (processor.chunk_size or 1000)} characters
+    ''}
+    - Chunk overlap: ${toString (processor.chunk_overlap or 200)}
     '' else if processor.type == "metadata_extractor" then ''
     - Fields: ${l.concatStringsSep ", " processor.fields}
+    '' else if processor.type == "dedup" then ''
+    - Exact duplicates (content hash): ${if processor.exact or true then "Yes" else "No"}
+    - Near duplicates (MinHash LSH): ${if processor.near or true then "Yes" else "No"}
+    - Similarity threshold: ${toString (processor.threshold or 0.85)}
+    - Shingle size: ${toString (processor.shingle_size or 5)} words
+
+    Duplicate chunks are not embedded or stored; they are listed under
+    `aliases` in the kept chunk's metadata. Savings are written to
+    `dedup_report.json` in the output directory.
     '' else ''
     - Custom processor type
     ''}
@@ -91,6 +116,16 @@ config: let
     - Model: ${config.embedder.model}
     - Batch size: ${toString config.embedder.batch_size}
 
+    ## Sinks
+
+    ${if config ? sinks then l.concatMapStrings (sink: ''
+    - ${sink.type}${l.optionalString (sink.type != "local") ": ${sink.url or (if sink.type == "weaviate" then "http://localhost:8080" else "http://localhost:6333")} (batches of ${toString (sink.batch_size or 256)}, ${toString (sink.max_in_flight or 4)} in flight)"}
+    '') config.sinks else ''
+    - local: JSON files in the output directory
+    ''}
+    HTTP sinks upsert with ids derived from the document ids, so re-running
+    the ingestor updates points in place instead of duplicating them.
+
     ## Usage
 
     ```bash
@@ -99,6 +134,14 @@ config: let
 
     # Run with custom output directory
     nix run .#run-vectorIngestors-${config.name} -- /path/to/output
+
+    # Profile the run: per-phase timings and peak RSS are written to
+    # profile.json in the output directory
+    nix run .#run-vectorIngestors-${config.name} -- /path/to/output --profile
+
+    # Also trace allocations (per-phase traced peak and top allocation sites);
+    # much slower, so use it to find what holds memory rather than for timings
+    nix run .#run-vectorIngestors-${config.name} -- /path/to/output --profile-memory
     ```
   '';
 
@@ -5,6 +5,17 @@ config: let
   # Get system-specific packages
   pkgs = nixpkgs.legacyPackages.${config.system};
   
+  # Serve several collections from one process when `collections` is set;
+  # each entry is { name, vectorDir, embedder ? }
+  multiCollection = config ? collections;
+  collectionsJson = pkgs.writeTextFile {
+    name = "vector-search-${config.name}-collections.json";
+    text = l.toJSON {
+      collections = config.collections;
+      memoryBudgetMB = config.memoryBudgetMB or null;
+    };
+  };
+  
   # Create service script
   serviceScript = ''
     #!/usr/bin/env bash
@@ -13,6 +24,10 @@ config: let
     echo "Starting vector search service: ${config.name}"
     echo "Listening on ${config.service.host}:${toString config.service.port}"
     
+    ${if multiCollection then ''
+    # Collections are loaded lazily on first query
+    SOURCE_ARGS=(--collections "${collectionsJson}" ${l.optionalString ((config.service.workers or 1) > 1) "--preload"})
+    '' else ''
     # Ensure vector directory exists
     VECTOR_DIR="${config.vectorDir}"
     if [ ! -d "$VECTOR_DIR" ]; then
@@ -20,15 +35,19 @@ config: let
       echo "Please run the vector ingestor first."
       exit 1
     fi
+    SOURCE_ARGS=(--vector-dir "$VECTOR_DIR")
+    ''}
     
     # Run the vector search service
     ${pkgs.python3.withPackages (ps: with ps; [ 
-      fastapi uvicorn numpy sentence-transformers
+      fastapi uvicorn numpy sentence-transformers orjson threadpoolctl
     ])}/bin/python ${root.utils.vectorSearch}/service.py \
-      --vector-dir "$VECTOR_DIR" \
+      "''${SOURCE_ARGS[@]}" \
       --host "${config.service.host}" \
       --port "${toString config.service.port}" \
-      --embedder-model "${config.embedder.model}"
+      --embedder-model "${config.embedder.model}" \
+      ${l.optionalString (config.service.serverTiming or false) "--server-timing"} \
+      --workers "${toString (config.service.workers or 1)}"
   '';
   
   # Create documentation
@@ -37,6 +56,17 @@ config: let
     
     ${config.description}
     
+    ${if multiCollection then ''
+    ## Collections
+    
+    ${l.concatMapStrings (collection: ''
+    - **${collection.name}**: ${collection.vectorDir} (`/collections/${collection.name}/search`)
+    '') config.collections}
+    
+    Collections are loaded on first query and shared embedders are loaded once
+    per model. ${if config ? memoryBudgetMB then "Least recently used idle collections are evicted above ${toString config.memoryBudgetMB} MB." else "No memory budget is set, so loaded collections are never evicted."}
+    Per-collection load and query statistics are reported on `/info`.
+    '' else ''
     ## Collection
     
     This service searches the **${config.collection}** vector collection.
@@ -44,11 +74,15 @@ config: let
     ## Vector Directory
     
     The service uses vectors stored in: ${config.vectorDir}
+    ''}
     
     ## Service Configuration
     
     - Host: ${config.service.host}
     - Port: ${toString config.service.port}
+    - Metrics: `http://${config.service.host}:${toString config.service.port}/metrics` (Prometheus text format; totals across all workers)
+    - Server-Timing headers: ${if config.service.serverTiming or false then "enabled" else "disabled"}
+    - Workers: ${toString (config.service.workers or 1)} (pre-forked; the model and vector matrix are loaded once and shared copy-on-write; `/info` describes the worker that answered, identified by its `worker` pid)
     
     ## Embedder
     
@@ -65,6 +99,17 @@ config: let
     curl -X POST http://${config.service.host}:${toString config.service.port}/search \
       -H "Content-Type: application/json" \
       -d '{"query": "Your search query", "limit": 10, "threshold": 0.5}'
+    
+    # Only return ids and scores
+    curl -X POST http://${config.service.host}:${toString config.service.port}/search \
+      -H "Content-Type: application/json" \
+      -d '{"query": "Your search query", "top_k": 10, "fields": ["id", "score"]}'
+    
+    # Search with a raw little-endian float32 vector (or send it base64-encoded
+    # as "vector_b64" to /search-by-vector)
+    curl -X POST "http://${config.service.host}:${toString config.service.port}/search-by-vector/raw?top_k=10&fields=id,score" \
+      -H "Content-Type: application/octet-stream" \
+      --data-binary @query.f32
     ```
   '';
   
@@ -84,8 +129,11 @@ config: let
   
 in {
   # Original configuration
-  inherit (config) name description collection;
-  inherit (config) vectorDir service embedder system;
+  inherit (config) name description;
+  inherit (config) service embedder system;
+  collection = config.collection or null;
+  vectorDir = config.vectorDir or null;
+  collections = config.collections or [];
   
   # Derivations
   service = serviceDrv;
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Offline benchmark for the ingest -> embed -> search pipeline.
+
+Everything runs against a seeded synthetic corpus and the deterministic
+hashing embedder, so results are reproducible and comparable between
+commits. Results are written as JSON; pass --baseline to compare against a
+previous run and exit non-zero on regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(UTILS_DIR, "vectorIngest"))
+sys.path.insert(0, os.path.join(UTILS_DIR, "vectorSearch"))
+
+from ingestor import process_file, embed_documents, save_vector_store
+from service import load_vector_store, search_vectors
+
+# Metrics where a larger value is better; all other numeric metrics are
+# treated as "lower is better" when comparing against a baseline
+HIGHER_IS_BETTER = ("per_second", "qps")
+
+def generate_corpus(output_dir: str, files: int, lines_per_file: int, seed: int) -> List[str]:
+    """Write a seeded synthetic text corpus and return the file paths."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"term{i}" for i in range(5000)])
+    paths = []
+    for i in range(files):
+        line_lengths = rng.integers(0, 24, size=lines_per_file)
+        words = vocabulary[rng.zipf(1.3, size=int(line_lengths.sum())) % len(vocabulary)]
+        lines = []
+        offset = 0
+        for length in line_lengths:
+            lines.append(" ".join(words[offset:offset + length]))
+            offset += length
+        path = os.path.join(output_dir, f"doc{i:05d}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+        paths.append(path)
+    return paths
+
+def random_store(count: int, dimensions: int, seed: int) -> Dict[str, Any]:
+    """Build an in-memory vector store of unit-length random vectors."""
+    rng = np.random.default_rng(seed)
+    vectors = np.empty((count, dimensions), dtype=np.float32)
+    block = 100000
+    for start in range(0, count, block):
+        part = rng.standard_normal((min(block, count - start), dimensions), dtype=np.float32)
+        part /= np.linalg.norm(part, axis=1, keepdims=True)
+        vectors[start:start + len(part)] = part
+    return {
+        "index": {"collection": "benchmark", "dimensions": dimensions},
+        "documents": [{"id": str(i), "content": "", "metadata": {"shard": i % 10}} for i in range(count)],
+        "vectors": vectors,
+    }
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of the files in a directory."""
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+def bench_chunking(paths: List[str], processors: List[Dict[str, Any]], embedder_config: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Measure process_file throughput over the corpus (with the stub embedder, so no model is loaded)."""
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    start = time.perf_counter()
+    chunks = []
+    for path in paths:
+        chunks.extend(process_file(path, processors, embedder_config)["chunks"])
+    elapsed = time.perf_counter() - start
+    return {
+        "files": len(paths),
+        "bytes": total_bytes,
+        "chunks": len(chunks),
+        "seconds": elapsed,
+        "files_per_second": len(paths) / elapsed,
+        "mb_per_second": total_bytes / elapsed / 1e6,
+        "chunks_per_second": len(chunks) / elapsed,
+    }, chunks
+
+def bench_embedding(chunks: List[Dict[str, Any]], embedder_config: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Measure embed_documents batch throughput."""
+    batch_size = embedder_config.get("batch_size", 32)
+    batches = (len(chunks) + batch_size - 1) // batch_size
+    start = time.perf_counter()
+    documents = embed_documents(chunks, embedder_config)
+    elapsed = time.perf_counter() - start
+    return {
+        "documents": len(documents),
+        "batch_size": batch_size,
+        "seconds": elapsed,
+        "batches_per_second": batches / elapsed,
+        "documents_per_second": len(documents) / elapsed,
+    }, documents
+
+def bench_store(documents: List[Dict[str, Any]], embedder_config: Dict[str, Any], work_dir: str) -> Dict[str, Any]:
+    """Measure save_vector_store/load_vector_store time and on-disk size."""
+    store_dir = os.path.join(work_dir, "store")
+    start = time.perf_counter()
+    save_vector_store(documents, store_dir, "benchmark", embedder_config)
+    save_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = load_vector_store(store_dir)
+    load_seconds = time.perf_counter() - start
+
+    size = directory_size(store_dir)
+    shutil.rmtree(store_dir)
+    return {
+        "documents": len(store["documents"]),
+        "save_seconds": save_seconds,
+        "load_seconds": load_seconds,
+        "size_bytes": size,
+        "bytes_per_document": size / max(len(documents), 1),
+    }
+
+def bench_search(count: int, dimensions: int, queries: int, top_k: int, seed: int) -> Dict[str, Any]:
+    """Measure search_vectors latency percentiles and QPS for one store size."""
+    store = random_store(count, dimensions, seed)
+    rng = np.random.default_rng(seed + 1)
+    query_vectors = rng.standard_normal((queries, dimensions), dtype=np.float32)
+
+    # Warm up caches and BLAS threads before timing
+    search_vectors(store, query_vectors[0], top_k)
+
+    latencies = np.empty(queries)
+    start = time.perf_counter()
+    for i in range(queries):
+        query_start = time.perf_counter()
+        search_vectors(store, query_vectors[i], top_k)
+        latencies[i] = time.perf_counter() - query_start
+    elapsed = time.perf_counter() - start
+    return {
+        "vectors": count,
+        "dimensions": dimensions,
+        "queries": queries,
+        "top_k": top_k,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "qps": queries / elapsed,
+    }
+
+def git_revision() -> Optional[str]:
+    """Return the current git commit, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=UTILS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested results into dotted metric names."""
+    metrics = {}
+    items = results.items() if isinstance(results, dict) else enumerate(results)
+    for key, value in items:
+        if isinstance(value, list) and value and isinstance(value[0], dict) and "vectors" in value[0]:
+            # Key search results by store size so runs with different sizes still line up
+            for entry in value:
+                metrics.update(flatten(entry, f"{prefix}{key}.{entry['vectors']}."))
+        elif isinstance(value, (dict, list)):
+            metrics.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[f"{prefix}{key}"] = value
+    return metrics
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return descriptions of timing/throughput metrics that regressed beyond tolerance."""
+    current = flatten(results)
+    previous = flatten(baseline)
+    regressions = []
+    for name, value in sorted(current.items()):
+        old = previous.get(name)
+        if not old or not (name.endswith("seconds") or name.endswith("_ms") or name.endswith(HIGHER_IS_BETTER)):
+            continue
+        higher_is_better = name.endswith(HIGHER_IS_BETTER)
+        change = (value - old) / old
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{name}: {old:.4g} -> {value:.4g} ({change:+.1%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingest/embed/search pipeline benchmark")
+    parser.add_argument("--files", type=int, default=200, help="Synthetic corpus file count")
+    parser.add_argument("--lines-per-file", type=int, default=500, help="Lines per synthetic file")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="text_splitter chunk size")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="text_splitter chunk overlap")
+    parser.add_argument("--splitter", default="lines", help="text_splitter splitter type")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding dimensions")
+    parser.add_argument("--batch-size", type=int, default=32, help="Embedding batch size")
+    parser.add_argument("--search-sizes", default="10000,100000,1000000", help="Comma-separated store sizes for search")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per store size")
+    parser.add_argument("--top-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Output JSON file (default: stdout)")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression vs. baseline")
+    args = parser.parse_args()
+
+    processors = [{
+        "type": "text_splitter",
+        "splitter": args.splitter,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+    }]
+    embedder_config = {"type": "hash", "dimensions": args.dimensions, "batch_size": args.batch_size}
+
+    # Pipeline functions log progress to stdout; keep stdout for the JSON report
+    work_dir = tempfile.mkdtemp(prefix="pipeline-benchmark-")
+    try:
+        corpus_dir = os.path.join(work_dir, "corpus")
+        os.makedirs(corpus_dir)
+        print(f"Generating corpus: {args.files} files x {args.lines_per_file} lines", file=sys.stderr)
+        paths = generate_corpus(corpus_dir, args.files, args.lines_per_file, args.seed)
+
+        with redirect_stdout(sys.stderr):
+            print("Benchmarking process_file...")
+            chunking, chunks = bench_chunking(paths, processors, embedder_config)
+            print("Benchmarking embed_documents...")
+            embedding, documents = bench_embedding(chunks, embedder_config)
+            print("Benchmarking save/load_vector_store...")
+            store = bench_store(documents, embedder_config, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    search = []
+    for size in [int(s) for s in args.search_sizes.split(",") if s]:
+        print(f"Benchmarking search_vectors at {size} vectors...", file=sys.stderr)
+        search.append(bench_search(size, args.dimensions, args.queries, args.top_k, args.seed))
+
+    results = {
+        "meta": {
+            "git_revision": git_revision(),
+            "created_at": int(time.time()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "chunking": chunking,
+        "embedding": embedding,
+        "store": store,
+        "search": search,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        comparable = {k: v for k, v in results.items() if k != "meta"}
+        regressions = compare(comparable, {k: v for k, v in baseline.items() if k != "meta"}, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
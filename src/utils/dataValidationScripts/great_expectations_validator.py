@@ -3,103 +3,271 @@
 import json
 import os
 import sys
+import glob
+import time
 import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
 import great_expectations as ge
 from great_expectations.core.batch import RuntimeBatchRequest
 from great_expectations.data_context import BaseDataContext
 from great_expectations.data_context.types.base import DataContextConfig
 
-def main():
-    # Parse arguments
-    parser = argparse.ArgumentParser(description='Great Expectations data validator')
-    parser.add_argument('--data-path', required=True, help='Path to dataset')
-    parser.add_argument('--output-path', required=True, help='Path to save validation results')
-    parser.add_argument('--config', required=True, help='Path to validation config')
-    args = parser.parse_args()
-    
-    # Load config
-    with open(args.config, 'r') as f:
-        config = json.load(f)
-    
-    # Create Great Expectations context
+# Expectation arguments that name the columns an expectation reads
+COLUMN_KEYS = ("column", "column_A", "column_B", "column_list")
+
+def create_context() -> BaseDataContext:
+    """Create an in-memory Great Expectations context."""
     context_config = DataContextConfig(
         store_backend_defaults={"class_name": "InMemoryStoreBackend"},
         expectations_store_name="expectations_store",
         validations_store_name="validations_store",
         evaluation_parameter_store_name="evaluation_parameter_store",
     )
-    context = BaseDataContext(project_config=context_config)
-    
-    # Load data
-    if args.data_path.endswith('.csv'):
+    return BaseDataContext(project_config=context_config)
+
+def expectation_columns(expectation: Dict[str, Any]) -> Optional[List[str]]:
+    """Return the columns an expectation reads, or None for table-level expectations."""
+    columns = []
+    for key in COLUMN_KEYS:
+        value = expectation.get(key)
+        if isinstance(value, list):
+            columns.extend(value)
+        elif value is not None:
+            columns.append(value)
+    return columns or None
+
+def group_expectations(expectations: List[Dict[str, Any]]) -> Dict[Any, List[Dict[str, Any]]]:
+    """Group expectations by the column(s) they read, keeping first-seen order."""
+    groups = OrderedDict()
+    for expectation in expectations:
+        columns = expectation_columns(expectation)
+        key = tuple(columns) if columns else None
+        groups.setdefault(key, []).append(expectation)
+    return groups
+
+def needs_full_table(expectation: Dict[str, Any]) -> bool:
+    """Whether an expectation must see every column, so the read cannot be pruned."""
+    # Table-level expectations compare against the file's full column list,
+    # column_index is a position in it, and row_condition reads other columns
+    return (
+        expectation["type"].startswith("expect_table_")
+        or "column_index" in expectation
+        or "row_condition" in expectation
+        or expectation_columns(expectation) is None
+    )
+
+def required_columns(expectations: List[Dict[str, Any]]) -> Optional[List[str]]:
+    """Return the columns needed to evaluate all expectations, or None if the whole table is needed."""
+    columns = []
+    for expectation in expectations:
+        if needs_full_table(expectation):
+            return None
+        expectation_cols = expectation_columns(expectation)
+        for column in expectation_cols:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+def load_dataframe(data_path: str, columns: Optional[List[str]] = None):
+    """Load a dataset into a pandas DataFrame, reading only the requested columns."""
+    if data_path.endswith('.csv'):
         import pandas as pd
-        df = pd.read_csv(args.data_path)
-        datasource = context.add_datasource(
-            "my_datasource",
-            class_name="Datasource",
-            execution_engine={"class_name": "PandasExecutionEngine"},
-            data_connectors={
-                "default_runtime_data_connector": {
-                    "class_name": "RuntimeDataConnector",
-                    "batch_identifiers": ["batch_id"],
-                }
-            },
-        )
-        
-        # Create batch request
-        batch_request = RuntimeBatchRequest(
-            datasource_name="my_datasource",
-            data_connector_name="default_runtime_data_connector",
-            data_asset_name="my_data_asset",
-            batch_identifiers={"batch_id": "default_identifier"},
-            runtime_parameters={"batch_data": df},
-        )
-    else:
-        raise ValueError(f"Unsupported file format: {args.data_path}")
-    
+        if columns is None:
+            return pd.read_csv(data_path)
+        # Missing columns must still fail expect_column_to_exist, so only
+        # restrict the read to columns actually present in the header
+        header = pd.read_csv(data_path, nrows=0).columns
+        return pd.read_csv(data_path, usecols=[c for c in columns if c in header])
+    raise ValueError(f"Unsupported file format: {data_path}")
+
+def validate_file(data_path: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate a single file against the configured expectations."""
+    start = time.perf_counter()
+    expectations = config.get("expectations", [])
+
+    # Create Great Expectations context
+    context = create_context()
+
+    # Load data
+    df = load_dataframe(data_path, required_columns(expectations))
+    context.add_datasource(
+        "my_datasource",
+        class_name="Datasource",
+        execution_engine={"class_name": "PandasExecutionEngine"},
+        data_connectors={
+            "default_runtime_data_connector": {
+                "class_name": "RuntimeDataConnector",
+                "batch_identifiers": ["batch_id"],
+            }
+        },
+    )
+
+    # Create batch request
+    batch_request = RuntimeBatchRequest(
+        datasource_name="my_datasource",
+        data_connector_name="default_runtime_data_connector",
+        data_asset_name="my_data_asset",
+        batch_identifiers={"batch_id": "default_identifier"},
+        runtime_parameters={"batch_data": df},
+    )
+
     # Create expectation suite
     expectation_suite_name = config["name"]
     context.create_expectation_suite(expectation_suite_name, overwrite_existing=True)
-    
+
     # Create validator
     validator = context.get_validator(
         batch_request=batch_request,
         expectation_suite_name=expectation_suite_name,
     )
-    
-    # Add expectations
-    for expectation in config["expectations"]:
-        # Get expectation type and parameters
-        expectation_type = expectation["type"]
-        expectation_params = {k: v for k, v in expectation.items() if k != "type"}
-        
-        # Call the appropriate expectation method
-        getattr(validator, expectation_type)(**expectation_params)
-    
+
+    # Only record expectations here; they are evaluated together by validate()
+    # below, which resolves shared column metrics in a single pass
+    validator.interactive_evaluation = False
+
+    # Add expectations, grouped so each column's expectations are adjacent
+    for group in group_expectations(expectations).values():
+        for expectation in group:
+            # Get expectation type and parameters
+            expectation_type = expectation["type"]
+            expectation_params = {k: v for k, v in expectation.items() if k != "type"}
+
+            # Call the appropriate expectation method
+            getattr(validator, expectation_type)(**expectation_params)
+
     # Save expectation suite
     validator.save_expectation_suite(discard_failed_expectations=False)
-    
+
     # Validate data
     results = validator.validate()
-    
+    elapsed = time.perf_counter() - start
+
+    return {
+        "data_path": data_path,
+        "passed": results.success,
+        "results": results.to_json_dict(),
+        "statistics": {
+            "evaluated_expectations": results.statistics["evaluated_expectations"],
+            "successful_expectations": results.statistics["successful_expectations"],
+            "unsuccessful_expectations": results.statistics["unsuccessful_expectations"],
+            "success_percent": results.statistics["success_percent"],
+            "rows": len(df),
+            "wall_clock_seconds": elapsed,
+        }
+    }
+
+def resolve_data_paths(data_path: str, pattern: str) -> List[str]:
+    """Expand a file, directory or glob into a sorted list of data files."""
+    if os.path.isdir(data_path):
+        return sorted(glob.glob(os.path.join(data_path, "**", pattern), recursive=True))
+    if glob.has_magic(data_path):
+        return sorted(glob.glob(data_path, recursive=True))
+    return [data_path]
+
+def result_file_name(data_path: str, base_path: str) -> str:
+    """Derive a unique per-file result name from a data path."""
+    relative = os.path.relpath(os.path.abspath(data_path), os.path.abspath(base_path))
+    return relative.replace(os.sep, "__") + ".json"
+
+def validate_files(data_paths: List[str], config: Dict[str, Any], workers: int, output_path: str, base_path: str) -> Dict[str, Any]:
+    """Validate many files across a process pool and write per-file results."""
+    start = time.perf_counter()
+    files_dir = os.path.join(output_path, "files")
+    os.makedirs(files_dir, exist_ok=True)
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(validate_file, path, config): path for path in data_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"data_path": path, "passed": False, "error": str(e), "statistics": {}}
+
+            result_file = os.path.join(files_dir, result_file_name(path, base_path))
+            with open(result_file, 'w') as f:
+                json.dump(result, f, indent=2)
+
+            print(f"{'PASS' if result['passed'] else 'FAIL'}: {path}")
+            summaries.append({
+                "data_path": path,
+                "passed": result["passed"],
+                "result_file": os.path.relpath(result_file, output_path),
+                "error": result.get("error"),
+                "statistics": result["statistics"],
+            })
+
+    elapsed = time.perf_counter() - start
+    summaries.sort(key=lambda s: s["data_path"])
+    total_rows = sum(s["statistics"].get("rows", 0) for s in summaries)
+
+    def total(key):
+        return sum(s["statistics"].get(key, 0) for s in summaries)
+
+    evaluated = total("evaluated_expectations")
+    successful = total("successful_expectations")
+    return {
+        "passed": all(s["passed"] for s in summaries),
+        "files": summaries,
+        "statistics": {
+            "files": len(summaries),
+            "failed_files": sum(1 for s in summaries if not s["passed"]),
+            "evaluated_expectations": evaluated,
+            "successful_expectations": successful,
+            "unsuccessful_expectations": total("unsuccessful_expectations"),
+            "success_percent": 100.0 * successful / evaluated if evaluated else None,
+            "rows": total_rows,
+            "workers": workers,
+            "wall_clock_seconds": elapsed,
+            "rows_per_second": total_rows / elapsed if elapsed > 0 else None,
+        }
+    }
+
+def main():
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='Great Expectations data validator')
+    parser.add_argument('--data-path', required=True, help='Path to dataset, directory of datasets, or glob')
+    parser.add_argument('--output-path', required=True, help='Path to save validation results')
+    parser.add_argument('--config', required=True, help='Path to validation config')
+    parser.add_argument('--pattern', default='*.csv', help='File pattern when --data-path is a directory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes for multi-file validation')
+    args = parser.parse_args()
+
+    # Load config
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+
     # Create output directory
     os.makedirs(args.output_path, exist_ok=True)
-    
+
+    # Resolve data files
+    multi_file = os.path.isdir(args.data_path) or glob.has_magic(args.data_path)
+    data_paths = resolve_data_paths(args.data_path, args.pattern)
+
+    if multi_file:
+        if not data_paths:
+            raise ValueError(f"No data files found: {args.data_path}")
+        if os.path.isdir(args.data_path):
+            base_path = args.data_path
+        else:
+            base_path = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in data_paths])
+        print(f"Validating {len(data_paths)} files with {args.workers} workers...")
+        output = validate_files(data_paths, config, args.workers, args.output_path, base_path)
+        stats = output["statistics"]
+        print(f"Validated {stats['rows']} rows in {stats['wall_clock_seconds']:.2f}s ({stats['rows_per_second'] or 0:.0f} rows/sec)")
+    else:
+        output = validate_file(data_paths[0], config)
+        del output["data_path"]
+
     # Save validation results
     with open(f"{args.output_path}/validation_result.json", 'w') as f:
-        json.dump({
-            "passed": results.success,
-            "results": results.to_json_dict(),
-            "statistics": {
-                "evaluated_expectations": results.statistics["evaluated_expectations"],
-                "successful_expectations": results.statistics["successful_expectations"],
-                "unsuccessful_expectations": results.statistics["unsuccessful_expectations"],
-                "success_percent": results.statistics["success_percent"],
-            }
-        }, f, indent=2)
-    
+        json.dump(output, f, indent=2)
+
     # Return success or failure
-    return 0 if results.success else 1
+    return 0 if output["passed"] else 1
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -6,6 +6,12 @@ import os
 import numpy as np
 from typing import List, Dict, Any, Optional
 
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(UTILS_DIR, "similarity"))
+sys.path.insert(0, os.path.join(UTILS_DIR, "instrumentation"))
+
+from profiling import add_profile_arguments, phase, start_profiling
+
 def load_config(config_file: str) -> Dict[str, Any]:
     """Load configuration from file."""
     with open(config_file, 'r') as f:
@@ -14,11 +20,14 @@ def load_config(config_file: str) -> Dict[str, Any]:
 def encode_text(text: str, model_uri: str, params: Dict[str, Any]) -> List[float]:
     """Encode text to embedding vector."""
     try:
-        from sentence_transformers import SentenceTransformer
-        model = SentenceTransformer(model_uri)
+        with phase("import"):
+            from sentence_transformers import SentenceTransformer
+        with phase("model_load"):
+            model = SentenceTransformer(model_uri)
 
         # Encode text
-        embedding = model.encode(text, **params)
+        with phase("encode"):
+            embedding = model.encode(text, **params)
 
         # Normalize if requested
         if params.get("normalize_embeddings", False):
@@ -40,14 +49,53 @@ def calculate_similarity(text1: str, text2: str, model_uri: str, params: Dict[st
 
     return float(similarity)
 
+def load_model(model_uri: str):
+    """Load a SentenceTransformer model."""
+    try:
+        with phase("import"):
+            from sentence_transformers import SentenceTransformer
+    except ImportError:
+        print("Error: sentence-transformers package is required")
+        raise ImportError("sentence-transformers package is required for text encoding")
+    with phase("model_load"):
+        return SentenceTransformer(model_uri)
+
+def calculate_similarity_matrix(input_file: str, input_file2: Optional[str], model_uri: str, params: Dict[str, Any],
+                                top_k: Optional[int], threshold: Optional[float], block_size: int, batch_size: int,
+                                output: Optional[str]) -> Dict[str, Any]:
+    """Compare two sets of texts (or one set with itself) and write JSON lines."""
+    from matrix import read_lines, write_matrix
+    
+    # Load the model once and encode each set in batches
+    model = load_model(model_uri)
+    encode_params = {**params, "batch_size": batch_size, "convert_to_numpy": True}
+    with phase("encode"):
+        left = model.encode(read_lines(input_file), **encode_params)
+        right = model.encode(read_lines(input_file2), **encode_params) if input_file2 else None
+    
+    with phase("similarity"):
+        if output:
+            with open(output, 'w') as f:
+                return write_matrix(f, left, right, top_k, threshold, block_size)
+        return write_matrix(sys.stdout, left, right, top_k, threshold, block_size)
+
 def main():
     parser = argparse.ArgumentParser(description="Embedding service runner")
     parser.add_argument("--config", required=True, help="Configuration file")
-    parser.add_argument("--mode", choices=["encode", "similarity"], required=True, help="Operation mode")
+    parser.add_argument("--mode", choices=["encode", "similarity", "matrix"], required=True, help="Operation mode")
     parser.add_argument("--input", help="Input file or text")
-    parser.add_argument("--input2", help="Second input file or text (for similarity mode)")
+    parser.add_argument("--input2", help="Second input file or text (for similarity and matrix modes)")
     parser.add_argument("--output", help="Output file (default: stdout)")
+    parser.add_argument("--top-k", type=int, help="Matrix mode: neighbours to keep per row")
+    parser.add_argument("--threshold", type=float, help="Matrix mode: minimum similarity (edge list without --top-k)")
+    parser.add_argument("--block-size", type=int, default=4096, help="Matrix mode: rows/columns per similarity tile")
+    parser.add_argument("--batch-size", type=int, default=64, help="Matrix mode: texts per encoding batch")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    start_profiling(args, args.output)
+
+    if args.mode == "matrix" and (not args.input or (args.top_k is None and args.threshold is None)):
+        parser.error("matrix mode needs --input and --top-k and/or --threshold")
 
     # Load configuration
     config = load_config(args.config)
@@ -75,11 +123,20 @@ def main():
             "dimensions": len(embedding)
         }
 
-        if args.output:
-            with open(args.output, 'w') as f:
-                json.dump(result, f, indent=2)
-        else:
-            print(json.dumps(result, indent=2))
+        with phase("write"):
+            if args.output:
+                with open(args.output, 'w') as f:
+                    json.dump(result, f, indent=2)
+            else:
+                print(json.dumps(result, indent=2))
+
+    elif args.mode == "matrix":
+        # One text per line; without --input2 all pairs within --input
+        summary = calculate_similarity_matrix(
+            args.input, args.input2, model_uri, params,
+            args.top_k, args.threshold, args.block_size, args.batch_size, args.output
+        )
+        print(json.dumps(summary), file=sys.stderr)
 
     elif args.mode == "similarity":
         # Get first input text
@@ -110,11 +167,12 @@ def main():
             "similarity": similarity
         }
 
-        if args.output:
-            with open(args.output, 'w') as f:
-                json.dump(result, f, indent=2)
-        else:
-            print(json.dumps(result, indent=2))
+        with phase("write"):
+            if args.output:
+                with open(args.output, 'w') as f:
+                    json.dump(result, f, indent=2)
+            else:
+                print(json.dumps(result, indent=2))
 
 if __name__ == "__main__":
     main()
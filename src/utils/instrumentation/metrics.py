@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Prometheus-style metrics and hot-path stage timing for the FastAPI services.
+
+The module has no dependencies beyond the standard library. Services call
+instrument_app() once; it installs a pure ASGI middleware (cheaper than
+Starlette's BaseHTTPMiddleware) that counts requests, tracks in-flight
+requests and request latency, and exposes everything on /metrics in the
+Prometheus text format.
+
+Code on the request path wraps its phases in ``with stage("score"):``. Stage
+timings go into a per-stage latency histogram and, when enabled, into the
+response's Server-Timing header. Outside an instrumented request, stage()
+is a no-op, so shared code can be called from scripts and benchmarks.
+
+Under pre-forked serving each worker has its own registry. share() makes a
+worker write snapshots of its values to a directory common to all workers
+(every SHARE_INTERVAL seconds and on each scrape), and /metrics on any
+worker renders the merged values: counters and histograms are summed,
+including those of workers that have exited, so totals never go backwards.
+Gauges come from live workers only and are summed or maxed per gauge.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds between snapshots written by a worker sharing its metrics
+SHARE_INTERVAL = 1.0
+
+# (metrics, stage timings) for the request being handled, if any
+_request_context: ContextVar[Optional[Tuple["ServiceMetrics", List[Tuple[str, float]]]]] = ContextVar(
+    "instrumentation_request", default=None
+)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def snapshot(self) -> List[List[Any]]:
+        """[labels, value] pairs, JSON-serializable for sharing between workers."""
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def combine(self, a, b):
+        return a + b
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, values: Optional[List[Tuple[Tuple[str, ...], float]]] = None) -> List[str]:
+        if values is None:
+            with self._lock:
+                values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+class Gauge(Counter):
+    """Value per label set that can go up and down.
+
+    aggregate says how values from several workers combine: "sum" for
+    per-worker quantities (in-flight requests), "max" for values every
+    worker reports for the same thing (model load time, store size).
+    """
+    kind = "gauge"
+
+    def __init__(self, *args, aggregate: str = "max", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.aggregate = aggregate
+
+    def combine(self, a, b):
+        return a + b if self.aggregate == "sum" else max(a, b)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(labels), [list(entry[0]), entry[1], entry[2]]] for labels, entry in self._values.items()]
+
+    def combine(self, a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    def render(self, values: Optional[List[Tuple[Tuple[str, ...], List[Any]]]] = None) -> List[str]:
+        if values is None:
+            with self._lock:
+                values = [(labels, list(entry[0]), entry[1], entry[2]) for labels, entry in self._values.items()]
+        else:
+            values = [(labels, entry[0], entry[1], entry[2]) for labels, entry in values]
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        for labels, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class ServiceMetrics:
+    """Metrics registry for one service process."""
+
+    def __init__(self, service: str):
+        self.service = service
+        self.metrics: List[_Metric] = []
+        self.requests = self.counter(
+            "http_requests_total", "Total HTTP requests.", ("method", "path", "status"))
+        self.in_flight = self.gauge(
+            "http_requests_in_flight", "HTTP requests currently being handled.", aggregate="sum")
+        self.latency = self.histogram(
+            "http_request_duration_seconds", "HTTP request latency.", ("method", "path"))
+        self.stages = self.histogram(
+            "stage_duration_seconds", "Latency of hot-path stages within a request.", ("stage",))
+        self.model_load = self.gauge(
+            "model_load_seconds", "Time taken to load a model.", ("model",))
+        self.store_documents = self.gauge(
+            "vector_store_documents", "Documents in a loaded vector store.", ("collection",))
+        self.store_bytes = self.gauge(
+            "vector_store_bytes", "Memory used by a loaded vector matrix.", ("collection",))
+        self.collection_loads = self.counter(
+            "vector_collection_loads_total", "Times a collection was loaded.", ("collection",))
+        self.collection_evictions = self.counter(
+            "vector_collection_evictions_total", "Times a collection was evicted to stay within the memory budget.", ("collection",))
+        self.collection_queries = self.counter(
+            "vector_collection_queries_total", "Queries served per collection.", ("collection",))
+        self.shared_dir: Optional[str] = None
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+              aggregate: str = "max") -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, aggregate=aggregate))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    @contextmanager
+    def time_model_load(self, model: str):
+        """Record how long the enclosed block takes to load a model."""
+        start = time.perf_counter()
+        yield
+        self.model_load.set(model, value=time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, List[List[Any]]]:
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+    def share(self, directory: str) -> None:
+        """Merge this worker's metrics with the other workers writing to directory."""
+        self.shared_dir = directory
+        self.write_shared()
+
+        def writer():
+            while True:
+                time.sleep(SHARE_INTERVAL)
+                self.write_shared()
+        threading.Thread(target=writer, name="metrics-share", daemon=True).start()
+
+    def write_shared(self) -> None:
+        """Write this worker's snapshot as <dir>/<pid>.json (atomically)."""
+        if self.shared_dir is None:
+            return
+        path = os.path.join(self.shared_dir, f"{os.getpid()}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _merged_values(self) -> Dict[str, List[Tuple[Tuple[str, ...], Any]]]:
+        self.write_shared()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.shared_dir, "*.json")):
+            try:
+                with open(path, 'r') as f:
+                    snapshots.append((json.load(f), not path.endswith(".exited.json")))
+            except (OSError, ValueError):
+                # A worker's file can vanish or be replaced while we read it
+                continue
+
+        merged = {}
+        for metric in self.metrics:
+            values: Dict[Tuple[str, ...], Any] = {}
+            for snapshot, live in snapshots:
+                if isinstance(metric, Gauge) and not live:
+                    continue
+                for labels, value in snapshot.get(metric.name, []):
+                    labels = tuple(labels)
+                    values[labels] = metric.combine(values[labels], value) if labels in values else value
+            merged[metric.name] = list(values.items())
+        return merged
+
+    def render(self) -> str:
+        merged = self._merged_values() if self.shared_dir is not None else {}
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render(merged.get(metric.name)))
+        return "\n".join(lines) + "\n"
+
+@contextmanager
+def _timed_stage(name: str, metrics: ServiceMetrics, timings: List[Tuple[str, float]]):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.stages.observe(name, value=elapsed)
+        timings.append((name, elapsed))
+
+def stage(name: str):
+    """Time a hot-path stage of the current request (no-op outside a request)."""
+    context = _request_context.get()
+    if context is None:
+        return nullcontext()
+    return _timed_stage(name, *context)
+
+def _server_timing(timings: List[Tuple[str, float]], total: float) -> bytes:
+    entries = [f"{name};dur={elapsed * 1000:.3f}" for name, elapsed in timings]
+    entries.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(entries).encode("latin-1")
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, in-flight requests and latency."""
+
+    def __init__(self, app, metrics: ServiceMetrics, server_timing: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        timings: List[Tuple[str, float]] = []
+        token = _request_context.set((metrics, timings))
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(timings, time.perf_counter() - start)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        metrics.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight.dec()
+            # Label by route template to keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            metrics.requests.inc(scope["method"], path, str(status[0]))
+            metrics.latency.observe(scope["method"], path, value=elapsed)
+            _request_context.reset(token)
+
+def instrument_app(app, service: str, server_timing: bool = False) -> ServiceMetrics:
+    """Attach request metrics and a /metrics endpoint to a FastAPI app."""
+    from fastapi.responses import PlainTextResponse
+
+    metrics = ServiceMetrics(service)
+    app.add_middleware(MetricsMiddleware, metrics=metrics, server_timing=server_timing)
+    # serve_prefork() finds the registry here and shares it between workers
+    app.state.metrics = metrics
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def get_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    return metrics
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Opt-in run profiling for the CLI runners and the vector ingestor.
+
+Scripts call add_profile_arguments() on their parser and start_profiling()
+right after parsing. With --profile, code wrapped in ``with phase("embed"):``
+records wall time, CPU time and process RSS for that phase. Nested phases
+are reported as "parent/child", and repeated phases are aggregated by name.
+When the process exits (normally or with an error), a JSON report is
+written next to the output with the phases and the peak RSS.
+
+--profile-memory adds tracemalloc: each phase gets its traced peak, and the
+top allocation sites are taken from a snapshot at the end of the phase where
+traced memory was highest (not at exit, when most data is already freed).
+Tracing slows allocation-heavy code several times over, so it is separate
+from --profile. --profile-cprofile (which also implies --profile) dumps cProfile stats for
+snakeviz/pstats. Without --profile, phase() is a no-op, so the
+instrumentation costs nothing in normal runs.
+"""
+import atexit
+import cProfile
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+_active: Optional["Profiler"] = None
+
+# Re-snapshot only when traced memory has grown this much past the last
+# snapshot, so many small repeated phases don't each pay for one
+SNAPSHOT_GROWTH = 1.1
+
+def peak_rss_bytes() -> int:
+    """Process RSS high-water mark."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def current_rss_bytes() -> Optional[int]:
+    """Current RSS, where /proc is available."""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def process_age_seconds() -> Optional[float]:
+    """Seconds since this process started (interpreter start-up plus imports), where /proc is available."""
+    try:
+        with open("/proc/self/stat", 'r') as f:
+            # Fields after the parenthesized command name; starttime is field 22
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", 'r') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class Profiler:
+    """Per-phase timings and memory for one run, written as a JSON report."""
+
+    def __init__(self, report_path: str, cprofile: bool = False, memory: bool = False,
+                 top_allocators: int = 25, trace_frames: int = 1):
+        self.report_path = report_path
+        self.memory = memory
+        self.top_allocators = top_allocators
+        self.trace_frames = trace_frames
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.error: Optional[str] = None
+        # The run followed by open phases: [name, tracemalloc peak seen so far]
+        self._stack: List[List[Any]] = [["run", 0]]
+        # Allocation snapshot at the end of the phase with the most traced memory
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_phase: Optional[str] = None
+        self._snapshot_bytes = 0
+        # Time spent taking snapshots, left out of the phases it happened in
+        self._overhead_wall = 0.0
+        self._overhead_cpu = 0.0
+        self._finished = False
+
+    def start(self) -> None:
+        self.startup_seconds = process_age_seconds()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        if self.memory:
+            tracemalloc.start(self.trace_frames)
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    @contextmanager
+    def phase(self, name: str):
+        path = "/".join([entry[0] for entry in self._stack[1:]] + [name])
+        if self.memory:
+            # Fold the peak so far into the parent, then measure this phase alone
+            _, peak = tracemalloc.get_traced_memory()
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+        entry = [name, 0]
+        self._stack.append(entry)
+
+        wall = time.perf_counter() - self._overhead_wall
+        cpu = time.process_time() - self._overhead_cpu
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - self._overhead_wall - wall
+            cpu = time.process_time() - self._overhead_cpu - cpu
+            self._stack.pop()
+
+            stats = self.phases.setdefault(path, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            stats["calls"] += 1
+            stats["wall_seconds"] += wall
+            stats["cpu_seconds"] += cpu
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(entry[1], peak)
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+                stats["traced_peak_bytes"] = max(stats.get("traced_peak_bytes", 0), peak)
+                self.snapshot_if_largest(path, current)
+            stats["rss_bytes"] = current_rss_bytes()
+            stats["peak_rss_bytes"] = peak_rss_bytes()
+
+    def snapshot_if_largest(self, path: str, traced_bytes: int) -> None:
+        """Keep a snapshot of live allocations if this is the most traced memory seen so far."""
+        if self._snapshot is not None and traced_bytes < self._snapshot_bytes * SNAPSHOT_GROWTH:
+            return
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        self._snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        self._snapshot_phase = path
+        self._snapshot_bytes = traced_bytes
+        self._overhead_wall += time.perf_counter() - wall
+        self._overhead_cpu += time.process_time() - cpu
+
+    def top_allocations(self) -> List[Dict[str, Any]]:
+        if self._snapshot is None:
+            # No phase finished (e.g. an early error): fall back to what is live now
+            self.snapshot_if_largest("exit", tracemalloc.get_traced_memory()[0])
+        return [
+            {"location": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+            for stat in self._snapshot.statistics("lineno")[:self.top_allocators]
+        ]
+
+    def finish(self) -> None:
+        """Write the report (and cProfile dump); safe to call more than once."""
+        if self._finished:
+            return
+        self._finished = True
+        if self.cprofile is not None:
+            self.cprofile.disable()
+
+        report = {
+            "argv": sys.argv,
+            "created_at": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "error": self.error,
+            "startup_seconds": self.startup_seconds,
+            "wall_seconds": time.perf_counter() - self._wall,
+            "cpu_seconds": time.process_time() - self._cpu,
+            "snapshot_seconds": self._overhead_wall,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "traced_peak_bytes": None,
+            "phases": self.phases,
+            "top_allocations": None,
+            "top_allocations_phase": None,
+            "cprofile": None,
+        }
+        if self.memory:
+            report["traced_peak_bytes"] = max(self._stack[0][1], tracemalloc.get_traced_memory()[1])
+            report["top_allocations"] = self.top_allocations()
+            report["top_allocations_phase"] = self._snapshot_phase
+            self._snapshot = None
+            tracemalloc.stop()
+
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        if self.cprofile is not None:
+            report["cprofile"] = os.path.splitext(self.report_path)[0] + ".prof"
+            self.cprofile.dump_stats(report["cprofile"])
+        with open(self.report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Profile written to {self.report_path}", file=sys.stderr)
+
+def phase(name: str):
+    """Time a phase of the current run (no-op unless --profile is active)."""
+    if _active is None:
+        return nullcontext()
+    return _active.phase(name)
+
+def add_profile_arguments(parser) -> None:
+    """Add the shared --profile options to a script's argument parser."""
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", action="store_true",
+                       help="Record per-phase wall/CPU time and RSS")
+    group.add_argument("--profile-memory", action="store_true",
+                       help="Also trace allocations (per-phase traced peak, top allocation sites); "
+                            "implies --profile and slows the run considerably")
+    group.add_argument("--profile-cprofile", action="store_true",
+                       help="Also dump cProfile stats (.prof) next to the report; implies --profile")
+    group.add_argument("--profile-output",
+                       help="Profile report path (default: next to the output)")
+
+def report_path_for(output: Optional[str], output_is_dir: bool = False) -> str:
+    """profile.json inside an output directory, or <output>.profile.json beside a file."""
+    if not output:
+        return "profile.json"
+    if output_is_dir:
+        return os.path.join(output, "profile.json")
+    return output + ".profile.json"
+
+def start_profiling(args, output: Optional[str] = None, output_is_dir: bool = False) -> Optional[Profiler]:
+    """Start profiling if any --profile option was given; the report is written at exit."""
+    global _active
+    memory = getattr(args, "profile_memory", False)
+    if not (getattr(args, "profile", False) or memory or getattr(args, "profile_cprofile", False)):
+        return None
+
+    report_path = args.profile_output or report_path_for(output, output_is_dir)
+    profiler = Profiler(report_path, cprofile=args.profile_cprofile, memory=memory)
+    profiler.start()
+    _active = profiler
+
+    # Record uncaught errors in the report before it is written at exit
+    previous_hook = sys.excepthook
+    def excepthook(kind, value, traceback):
+        profiler.error = f"{kind.__name__}: {value}"
+        previous_hook(kind, value, traceback)
+    sys.excepthook = excepthook
+
+    atexit.register(profiler.finish)
+    return profiler
@@ -5,14 +5,30 @@ import sys
 import os
 import numpy as np
 
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(UTILS_DIR, "similarity"))
+sys.path.insert(0, os.path.join(UTILS_DIR, "instrumentation"))
+
+from profiling import add_profile_arguments, phase, start_profiling
+
 def main():
     parser = argparse.ArgumentParser(description="Run embedding models")
     parser.add_argument("--model-uri", required=True, help="Model URI or path")
     parser.add_argument("--input", required=True, help="Input file path")
     parser.add_argument("--output", required=True, help="Output file path")
     parser.add_argument("--config", required=True, help="Config file path")
-    parser.add_argument("--mode", default="encode", choices=["encode", "similarity"], help="Operation mode")
+    parser.add_argument("--mode", default="encode", choices=["encode", "similarity", "matrix"], help="Operation mode")
+    parser.add_argument("--input2", help="Second input file for matrix mode (default: all pairs within --input)")
+    parser.add_argument("--top-k", type=int, help="Matrix mode: neighbours to keep per row")
+    parser.add_argument("--threshold", type=float, help="Matrix mode: minimum similarity (edge list without --top-k)")
+    parser.add_argument("--block-size", type=int, default=4096, help="Matrix mode: rows/columns per similarity tile")
+    parser.add_argument("--batch-size", type=int, default=64, help="Matrix mode: texts per encoding batch")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    start_profiling(args, args.output)
+    
+    if args.mode == "matrix" and args.top_k is None and args.threshold is None:
+        parser.error("matrix mode needs --top-k and/or --threshold")
     
     # Load config
     with open(args.config, 'r') as f:
@@ -24,23 +40,28 @@ def main():
     
     # Load model based on framework
     if config["framework"] == "sentence-transformers":
-        from sentence_transformers import SentenceTransformer
-        model = SentenceTransformer(args.model_uri)
+        with phase("import"):
+            from sentence_transformers import SentenceTransformer
+        with phase("model_load"):
+            model = SentenceTransformer(args.model_uri)
     elif config["framework"] == "huggingface":
-        from transformers import AutoModel, AutoTokenizer
-        import torch
+        with phase("import"):
+            from transformers import AutoModel, AutoTokenizer
+            import torch
         
         # Load model and tokenizer
-        tokenizer = AutoTokenizer.from_pretrained(args.model_uri)
-        model = AutoModel.from_pretrained(args.model_uri)
+        with phase("model_load"):
+            tokenizer = AutoTokenizer.from_pretrained(args.model_uri)
+            model = AutoModel.from_pretrained(args.model_uri)
         
         # Define encoding function
         def encode(texts, **kwargs):
             # Tokenize
-            encoded_input = tokenizer(texts, padding=True, truncation=True, return_tensors='pt')
+            with phase("tokenize"):
+                encoded_input = tokenizer(texts, padding=True, truncation=True, return_tensors='pt')
             
             # Compute token embeddings
-            with torch.no_grad():
+            with phase("forward"), torch.no_grad():
                 model_output = model(**encoded_input)
             
             # Mean pooling
@@ -56,10 +77,11 @@ def main():
         # Split input into lines if multiple
         texts = [line for line in input_text.split('\n') if line.strip()]
         
-        if config["framework"] == "sentence-transformers":
-            embeddings = model.encode(texts, **config.get("params", {}))
-        else:
-            embeddings = encode(texts, **config.get("params", {})).numpy()
+        with phase("encode"):
+            if config["framework"] == "sentence-transformers":
+                embeddings = model.encode(texts, **config.get("params", {}))
+            else:
+                embeddings = encode(texts, **config.get("params", {})).numpy()
         
         # Convert to list for JSON serialization
         if isinstance(embeddings, np.ndarray):
@@ -73,6 +95,29 @@ def main():
         else:
             result = {"embeddings": embeddings_list}
     
+    elif args.mode == "matrix":
+        from matrix import read_lines, write_matrix
+        
+        # One text per line in each input file
+        def encode_set(path):
+            texts = read_lines(path)
+            if config["framework"] == "sentence-transformers":
+                return model.encode(texts, **{**config.get("params", {}), "batch_size": args.batch_size})
+            return np.concatenate([
+                encode(texts[i:i + args.batch_size], **config.get("params", {})).numpy()
+                for i in range(0, len(texts), args.batch_size)
+            ]) if texts else np.zeros((0, 0), dtype=np.float32)
+        
+        with phase("encode"):
+            left = encode_set(args.input)
+            right = encode_set(args.input2) if args.input2 else None
+        
+        # Results are streamed as JSON lines; the summary goes to stderr
+        with phase("similarity"), open(args.output, 'w') as f:
+            summary = write_matrix(f, left, right, args.top_k, args.threshold, args.block_size)
+        print(json.dumps(summary), file=sys.stderr)
+        return
+    
     elif args.mode == "similarity":
         # Expect two texts separated by a tab
         if '\t' not in input_text:
@@ -80,20 +125,21 @@ def main():
         
         text1, text2 = input_text.split('\t', 1)
         
-        if config["framework"] == "sentence-transformers":
-            similarity = model.similarity(text1, text2, **config.get("params", {}))
-            result = {"similarity": float(similarity)}
-        else:
-            # Manual similarity calculation
-            emb1 = encode([text1], **config.get("params", {})).numpy()
-            emb2 = encode([text2], **config.get("params", {})).numpy()
+        with phase("similarity"):
+            if config["framework"] == "sentence-transformers":
+                similarity = model.similarity(text1, text2, **config.get("params", {}))
+                result = {"similarity": float(similarity)}
+            else:
+                # Manual similarity calculation
+                emb1 = encode([text1], **config.get("params", {})).numpy()
+                emb2 = encode([text2], **config.get("params", {})).numpy()
             
-            # Cosine similarity
-            similarity = np.dot(emb1[0], emb2[0]) / (np.linalg.norm(emb1[0]) * np.linalg.norm(emb2[0]))
-            result = {"similarity": float(similarity)}
+                # Cosine similarity
+                similarity = np.dot(emb1[0], emb2[0]) / (np.linalg.norm(emb1[0]) * np.linalg.norm(emb2[0]))
+                result = {"similarity": float(similarity)}
     
     # Write output
-    with open(args.output, 'w') as f:
+    with phase("write"), open(args.output, 'w') as f:
         json.dump(result, f, indent=2)
 
 if __name__ == "__main__":
@@ -3,7 +3,11 @@ import argparse
 import json
 import sys
 import os
-from transformers import pipeline
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(UTILS_DIR, "instrumentation"))
+
+from profiling import add_profile_arguments, phase, start_profiling
 
 def main():
     parser = argparse.ArgumentParser(description="Run Hugging Face models")
@@ -12,7 +16,12 @@ def main():
     parser.add_argument("--input", required=True, help="Input file path")
     parser.add_argument("--output", required=True, help="Output file path")
     parser.add_argument("--config", required=True, help="Config file path")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    start_profiling(args, args.output)
+    
+    with phase("import"):
+        from transformers import pipeline
     
     # Load config
     with open(args.config, 'r') as f:
@@ -39,22 +48,22 @@ def main():
     hf_task = task_mapping.get(args.task, args.task)
     
     # Initialize model
-    model = pipeline(hf_task, model=args.model_uri)
+    with phase("model_load"):
+        model = pipeline(hf_task, model=args.model_uri)
     
     # Process input based on task
-    if args.task == "summarizers":
+    with phase("inference"):
         result = model(input_text, **config.get("params", {}))
+    if args.task == "summarizers":
         output = result[0]["summary_text"] if isinstance(result, list) else result["summary_text"]
     elif args.task == "sentimentAnalyzers":
-        result = model(input_text, **config.get("params", {}))
         output = json.dumps(result, indent=2)
     # Add handlers for other tasks
     else:
-        result = model(input_text, **config.get("params", {}))
         output = json.dumps(result, indent=2)
     
     # Write output
-    with open(args.output, 'w') as f:
+    with phase("write"), open(args.output, 'w') as f:
         f.write(output)
 
 if __name__ == "__main__":
@@ -3,8 +3,11 @@ import argparse
 import json
 import sys
 import os
-import torch
-from transformers import pipeline, AutoProcessor, AutoModelForSpeechSeq2Seq
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(UTILS_DIR, "instrumentation"))
+
+from profiling import add_profile_arguments, phase, start_profiling
 
 def main():
     parser = argparse.ArgumentParser(description="Run speech transcription models")
@@ -12,31 +15,39 @@ def main():
     parser.add_argument("--input", required=True, help="Input audio file path")
     parser.add_argument("--output", required=True, help="Output file path")
     parser.add_argument("--config", required=True, help="Config file path")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    start_profiling(args, args.output)
+    
+    with phase("import"):
+        import torch
+        from transformers import pipeline, AutoProcessor, AutoModelForSpeechSeq2Seq
     
     # Load config
     with open(args.config, 'r') as f:
         config = json.load(f)
     
     # Load model
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    processor = AutoProcessor.from_pretrained(args.model_uri)
-    model = AutoModelForSpeechSeq2Seq.from_pretrained(args.model_uri).to(device)
-    
-    # Create pipeline
-    transcriber = pipeline(
-        "automatic-speech-recognition",
-        model=model,
-        tokenizer=processor.tokenizer,
-        feature_extractor=processor.feature_extractor,
-        device=device,
-    )
+    with phase("model_load"):
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        processor = AutoProcessor.from_pretrained(args.model_uri)
+        model = AutoModelForSpeechSeq2Seq.from_pretrained(args.model_uri).to(device)
+        
+        # Create pipeline
+        transcriber = pipeline(
+            "automatic-speech-recognition",
+            model=model,
+            tokenizer=processor.tokenizer,
+            feature_extractor=processor.feature_extractor,
+            device=device,
+        )
     
     # Process audio
-    result = transcriber(args.input, **config.get("params", {}))
+    with phase("inference"):
+        result = transcriber(args.input, **config.get("params", {}))
     
     # Write output
-    with open(args.output, 'w') as f:
+    with phase("write"), open(args.output, 'w') as f:
         if isinstance(result, dict) and "text" in result:
             f.write(result["text"])
         else:
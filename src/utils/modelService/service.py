@@ -5,21 +5,62 @@ import sys
 import os
 import uvicorn
 from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(UTILS_DIR, "instrumentation"))
+sys.path.insert(0, os.path.join(UTILS_DIR, "serving"))
+from metrics import instrument_app, stage
+from prefork import serve_prefork
+
 class TextInput(BaseModel):
     text: str
     params: Optional[Dict[str, Any]] = None
 
-def create_app(model_uri, framework, task, config):
+def create_app(model_uri, framework, task, config, server_timing=False):
     app = FastAPI(
         title=f"{task.capitalize()} Service",
         description=f"API for {task} using {framework} framework",
         version="1.0.0"
     )
     
-    # Load model based on framework
+    # Request metrics and per-stage timings on /metrics
+    metrics = instrument_app(app, "modelService", server_timing=server_timing)
+    
+    with metrics.time_model_load(model_uri):
+        model = load_model(model_uri, framework, task, config)
+    
+    @app.post("/process")
+    async def process(input_data: TextInput):
+        try:
+            # Merge default params with request params
+            params = {**config.get("params", {}), **(input_data.params or {})}
+            
+            # Process with model based on task
+            with stage("inference"):
+                result = model(input_data.text, **params)
+            
+            with stage("serialize"):
+                if task == "summarizers":
+                    if isinstance(result, list):
+                        return JSONResponse({"summary": result[0]["summary_text"]})
+                    return JSONResponse({"summary": result["summary_text"]})
+                # Add handlers for other tasks
+                return JSONResponse(jsonable_encoder(result))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+    
+    return app
+
+def load_model(model_uri, framework, task, config):
+    """Load a model for the given framework."""
     if framework == "huggingface":
         from transformers import pipeline
         model_params = config.get("params", {})
@@ -56,33 +97,7 @@ def create_app(model_uri, framework, task, config):
     else:
         raise ValueError(f"Unsupported framework: {framework}")
     
-    @app.post("/process")
-    async def process(input_data: TextInput):
-        try:
-            # Merge default params with request params
-            params = {**config.get("params", {}), **(input_data.params or {})}
-            
-            # Process with model based on task
-            if task == "summarizers":
-                result = model(input_data.text, **params)
-                if isinstance(result, list):
-                    return {"summary": result[0]["summary_text"]}
-                return {"summary": result["summary_text"]}
-            elif task == "sentimentAnalyzers":
-                result = model(input_data.text, **params)
-                return result
-            # Add handlers for other tasks
-            else:
-                result = model(input_data.text, **params)
-                return result
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-    
-    @app.get("/health")
-    async def health():
-        return {"status": "healthy"}
-    
-    return app
+    return model
 
 def main():
     parser = argparse.ArgumentParser(description="Run model as a service")
@@ -92,6 +107,8 @@ def main():
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind")
     parser.add_argument("--config", required=True, help="Config file path")
+    parser.add_argument("--server-timing", action="store_true", help="Add per-stage Server-Timing response headers")
+    parser.add_argument("--workers", type=int, default=1, help="Pre-forked worker processes sharing the loaded model")
     args = parser.parse_args()
     
     # Load config
@@ -99,10 +116,13 @@ def main():
         config = json.load(f)
     
     # Create FastAPI app
-    app = create_app(args.model_uri, args.framework, args.task, config)
+    app = create_app(args.model_uri, args.framework, args.task, config, server_timing=args.server_timing)
     
-    # Run server
-    uvicorn.run(app, host=args.host, port=args.port)
+    # Run server; pre-forked workers share the model loaded above
+    if args.workers > 1:
+        serve_prefork(app, args.host, args.port, args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
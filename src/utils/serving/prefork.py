@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Pre-fork multi-worker serving for the FastAPI services.
+
+Running uvicorn with --workers spawns fresh interpreters, so each worker
+re-imports torch, reloads the model and re-parses the vector store. Here
+the caller builds the app (model weights, vector matrix) once in the parent
+process. The parent then forks workers that serve from one shared listening
+socket. Large read-only buffers such as model weights and the numpy vector
+matrix stay shared copy-on-write, so RAM does not grow N-fold with workers.
+
+The parent supervises the workers. Workers that exit are restarted, with a
+backoff when they crash right after starting. SIGINT/SIGTERM are forwarded
+for a graceful shutdown.
+
+Apps instrumented with instrument_app() keep one metrics registry per
+worker. The workers share snapshots through a temporary directory, so
+/metrics on any worker reports totals for the whole service. Each worker's
+torch and BLAS (numpy) thread pools are capped at its share of the cores;
+BLAS needs the optional threadpoolctl package, since numpy is already
+loaded when the workers fork.
+
+Do not run inference in the parent before forking: an initialized
+OpenMP/MKL thread pool does not survive fork and can deadlock workers.
+"""
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+from typing import Dict, Optional
+
+# A worker that dies sooner than this after starting counts as a crash
+MIN_WORKER_UPTIME = 5.0
+MAX_RESTART_DELAY = 30.0
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Create the listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+BLAS_THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+def _limit_threads(threads: int) -> None:
+    """Split the machine's cores between workers instead of oversubscribing."""
+    # Libraries first loaded in the worker read these at import
+    for variable in BLAS_THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+    # numpy's BLAS pool was created in the parent, so resize it in place
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        if "numpy" in sys.modules:
+            print("Warning: threadpoolctl not available; numpy BLAS threads are not limited per worker")
+        return
+    threadpool_limits(limits=threads)
+
+def _app_metrics(app):
+    """The registry instrument_app() attached to the app, if any."""
+    return getattr(getattr(app, "state", None), "metrics", None)
+
+def _run_worker(app, sock: socket.socket, threads: Optional[int], uvicorn_options: Dict,
+                metrics_dir: Optional[str]) -> None:
+    import uvicorn
+
+    # Children must not run the parent's supervisor signal handlers
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if threads:
+        _limit_threads(threads)
+
+    metrics = _app_metrics(app)
+    if metrics is not None and metrics_dir is not None:
+        metrics.share(metrics_dir)
+
+    config = uvicorn.Config(app, **uvicorn_options)
+    server = uvicorn.Server(config)
+    try:
+        server.run(sockets=[sock])
+    finally:
+        if metrics is not None:
+            # Final counts, kept after this worker exits
+            metrics.write_shared()
+
+def serve_prefork(app, host: str, port: int, workers: int,
+                  threads_per_worker: Optional[int] = None, **uvicorn_options) -> None:
+    """Serve app from `workers` forked processes sharing the parent's memory."""
+    sock = bind_socket(host, port)
+
+    # Move everything allocated so far (model, vectors, documents) out of the
+    # collector's reach so GC passes in workers don't write to shared pages
+    gc.collect()
+    gc.freeze()
+
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    # Workers write metric snapshots here so any of them can report totals
+    metrics_dir = tempfile.mkdtemp(prefix="prefork-metrics-") if _app_metrics(app) is not None else None
+
+    children: Dict[int, float] = {}
+    restart_delay = 0.0
+    stopping = False
+
+    def spawn():
+        # Don't let children inherit (and re-emit) buffered parent output
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                _run_worker(app, sock, threads_per_worker, uvicorn_options, metrics_dir)
+                code = 0
+            except BaseException:
+                # os._exit skips the interpreter's own error report, so print it here
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        children[pid] = time.monotonic()
+        print(f"Started worker {pid}")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"Starting {workers} workers on {host}:{port} (parent pid {os.getpid()})")
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        started = children.pop(pid, None)
+        if metrics_dir is not None:
+            # Keep an exited worker's counters in the totals, but not its gauges
+            snapshot = os.path.join(metrics_dir, f"{pid}.json")
+            if os.path.exists(snapshot):
+                os.replace(snapshot, os.path.join(metrics_dir, f"{pid}.exited.json"))
+        if started is None or stopping:
+            continue
+
+        code = os.waitstatus_to_exitcode(status)
+        uptime = time.monotonic() - started
+        if uptime < MIN_WORKER_UPTIME:
+            restart_delay = min(max(restart_delay * 2, 0.5), MAX_RESTART_DELAY)
+        else:
+            restart_delay = 0.0
+        print(f"Worker {pid} exited with {code} after {uptime:.1f}s; restarting in {restart_delay:.1f}s")
+        time.sleep(restart_delay)
+        if not stopping:
+            spawn()
+
+    sock.close()
+    if metrics_dir is not None:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Blocked cosine similarity between two sets of embeddings.
+
+Shared by the embedding runners' "matrix" mode. Rows are L2-normalized
+once. The N x M similarity matrix is then computed one block x block tile
+at a time with a float32 GEMM, so memory stays at one tile plus the
+per-row results, never the full matrix. Two reductions are supported:
+the top-k neighbours of every row, or every pair at or above a threshold
+(a sparse edge list). In all-pairs mode (one set compared with itself),
+self matches are excluded. Edges are reported once per pair, and tiles
+below the diagonal are skipped.
+"""
+import json
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+import numpy as np
+
+def normalize_rows(embeddings) -> np.ndarray:
+    """Return float32 rows scaled to unit length (zero rows stay zero)."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+def iter_tiles(left: np.ndarray, right: np.ndarray, block_size: int,
+               all_pairs: bool = False, lower: bool = True) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """Yield (row_start, col_start, tile) similarity tiles of normalized inputs.
+
+    With all_pairs and lower=False, tiles entirely below the diagonal are skipped.
+    """
+    for row_start in range(0, len(left), block_size):
+        rows = left[row_start:row_start + block_size]
+        for col_start in range(0, len(right), block_size):
+            if all_pairs and not lower and col_start + block_size <= row_start:
+                continue
+            yield row_start, col_start, rows @ right[col_start:col_start + block_size].T
+
+def top_k_blocks(left: np.ndarray, right: np.ndarray, k: int, block_size: int = 4096,
+                 all_pairs: bool = False) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """Yield (row_start, indices, scores) with each row's top-k columns, best first."""
+    k = min(k, len(right) - (1 if all_pairs else 0))
+    if k <= 0:
+        return
+    for row_start in range(0, len(left), block_size):
+        rows = left[row_start:row_start + block_size]
+        best_scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+        best_indices = np.zeros((len(rows), k), dtype=np.int64)
+        for col_start in range(0, len(right), block_size):
+            tile = rows @ right[col_start:col_start + block_size].T
+            if all_pairs:
+                # Mask self matches where this tile crosses the diagonal
+                own = np.arange(row_start, row_start + len(rows))
+                local = own - col_start
+                inside = (local >= 0) & (local < tile.shape[1])
+                tile[np.nonzero(inside)[0], local[inside]] = -np.inf
+
+            # Reduce the tile to its own top-k first, then merge with the running best
+            if tile.shape[1] > k:
+                part = np.argpartition(tile, -k, axis=1)[:, -k:]
+            else:
+                part = np.broadcast_to(np.arange(tile.shape[1]), tile.shape)
+            scores = np.concatenate([best_scores, np.take_along_axis(tile, part, axis=1)], axis=1)
+            indices = np.concatenate([best_indices, part + col_start], axis=1)
+            keep = np.argpartition(scores, -k, axis=1)[:, -k:]
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_indices = np.take_along_axis(indices, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        yield row_start, np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+def threshold_edges(left: np.ndarray, right: np.ndarray, threshold: float, block_size: int = 4096,
+                    all_pairs: bool = False) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Yield (rows, cols, scores) arrays of pairs with similarity >= threshold."""
+    for row_start, col_start, tile in iter_tiles(left, right, block_size, all_pairs, lower=False):
+        rows, cols = np.nonzero(tile >= threshold)
+        rows += row_start
+        cols += col_start
+        if all_pairs:
+            # Each unordered pair once, no self matches
+            upper = cols > rows
+            rows, cols = rows[upper], cols[upper]
+        yield rows, cols, tile[rows - row_start, cols - col_start]
+
+def write_matrix(out: IO[str], left: np.ndarray, right: Optional[np.ndarray],
+                 top_k: Optional[int] = None, threshold: Optional[float] = None,
+                 block_size: int = 4096) -> Dict[str, Any]:
+    """Write top-k neighbours or thresholded edges as JSON lines; return a summary.
+
+    Without right, left is compared with itself (all pairs). Top-k records
+    are {"index", "neighbours": [{"index", "score"}]}, optionally filtered by
+    threshold. Edge records are {"source", "target", "score"}.
+    """
+    all_pairs = right is None
+    left = normalize_rows(left)
+    right = left if all_pairs else normalize_rows(right)
+    records = 0
+
+    if top_k:
+        for row_start, indices, scores in top_k_blocks(left, right, top_k, block_size, all_pairs):
+            for offset in range(len(indices)):
+                neighbours = [
+                    {"index": int(j), "score": round(float(s), 6)}
+                    for j, s in zip(indices[offset], scores[offset])
+                    if threshold is None or s >= threshold
+                ]
+                out.write(json.dumps({"index": row_start + offset, "neighbours": neighbours}) + "\n")
+                records += len(neighbours)
+        output = "top_k"
+    elif threshold is not None:
+        for rows, cols, scores in threshold_edges(left, right, threshold, block_size, all_pairs):
+            for i, j, s in zip(rows.tolist(), cols.tolist(), scores.tolist()):
+                out.write(json.dumps({"source": i, "target": j, "score": round(s, 6)}) + "\n")
+            records += len(rows)
+        output = "edges"
+    else:
+        raise ValueError("Matrix mode needs top_k and/or threshold")
+
+    return {
+        "output": output,
+        "rows": len(left),
+        "columns": len(right),
+        "all_pairs": all_pairs,
+        "top_k": top_k,
+        "threshold": threshold,
+        "block_size": block_size,
+        "records": records,
+    }
+
+def read_lines(path: str) -> List[str]:
+    """Read one text per non-empty line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""Concurrent crawler for the vector ingestor's "web" sources.
+
+Pages are fetched by a pool of asyncio workers sharing one pooled HTTP
+client, so throughput scales with concurrency rather than page latency.
+Requests to each host are capped separately. Responses are cached between
+runs with their ETag/Last-Modified validators; unchanged pages come back as
+304 Not Modified and are served from the cache. HTML is reduced to text
+with the standard library parser and returned for the ingestor's chunk and
+embed path.
+
+Run standalone to crawl a site and print the extracted pages:
+
+    crawler.py https://docs.example.com/ --depth 2 --concurrency 32
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from contextlib import asynccontextmanager, redirect_stdout
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urljoin, urldefrag, urlparse
+import httpx
+
+USER_AGENT = "vector-ingestor-crawler/1.0"
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Elements whose text is not page content
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe"}
+# Elements that start a new line, so line-based splitters see paragraph boundaries
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "dl", "dt", "dd", "tr", "table", "pre", "blockquote",
+    "section", "article", "header", "footer", "main", "aside", "nav", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+}
+
+class TextExtractor(HTMLParser):
+    """Collect visible text, the title and outgoing links from an HTML page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.links: List[str] = []
+        self.title_parts: List[str] = []
+        self.base: Optional[str] = None
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+        elif tag == "base" and self.base is None:
+            self.base = dict(attrs).get("href")
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+        elif not self._skip:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+    def title(self) -> str:
+        return " ".join("".join(self.title_parts).split())
+
+def extract_html(html: str) -> Tuple[str, str, List[str], Optional[str]]:
+    """Return (title, text, links, base href) for an HTML document."""
+    parser = TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return parser.title(), parser.text(), parser.links, parser.base
+
+def load_cache(cache_path: str) -> Dict[str, Dict[str, Any]]:
+    """Load the per-URL validator/content cache from a previous run."""
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"Warning: ignoring unreadable crawl cache {cache_path}")
+        return {}
+
+def save_cache(cache_path: str, cache: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+def cache_path_for(source: Dict[str, Any], cache_dir: str) -> str:
+    """Cache file for a source, keyed by its seed URLs."""
+    key = hashlib.md5("\n".join(sorted(source.get("urls", []))).encode()).hexdigest()
+    return os.path.join(cache_dir, f"{key}.json")
+
+def resolve_links(page_url: str, base: Optional[str], links: List[str]) -> List[str]:
+    """Absolute, fragment-free link URLs; malformed hrefs are skipped one by one."""
+    try:
+        base_url = urljoin(page_url, base) if base else page_url
+    except ValueError:
+        base_url = page_url
+    resolved = []
+    for link in links:
+        try:
+            resolved.append(urldefrag(urljoin(base_url, link))[0])
+        except ValueError:
+            continue
+    return resolved
+
+class Crawler:
+    """Breadth-first crawl of one web source with bounded concurrency."""
+
+    def __init__(self, source: Dict[str, Any], cache: Dict[str, Dict[str, Any]]):
+        self.seeds = [urldefrag(url)[0] for url in source.get("urls", [])]
+        self.depth = source.get("depth", 0)
+        self.include = [re.compile(p) for p in source.get("include_patterns", [])]
+        self.exclude = [re.compile(p) for p in source.get("exclude_patterns", [])]
+        self.max_pages = source.get("max_pages")
+        self.concurrency = source.get("concurrency", 16)
+        self.per_host = source.get("per_host_concurrency", 8)
+        self.timeout = source.get("timeout", 30)
+        self.retries = source.get("retries", 2)
+        self.hosts = {urlparse(url).netloc for url in self.seeds}
+
+        self.cache = cache
+        self.new_cache: Dict[str, Dict[str, Any]] = {}
+        self.pages: List[Dict[str, Any]] = []
+        self.seen = set()
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self.stats = {"fetched": 0, "not_modified": 0, "skipped": 0, "errors": 0, "bytes": 0}
+
+    def allowed(self, url: str) -> bool:
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or parsed.netloc not in self.hosts:
+            return False
+        if self.include and not any(p.search(parsed.path) for p in self.include):
+            return False
+        return not any(p.search(parsed.path) for p in self.exclude)
+
+    @asynccontextmanager
+    async def host_limit(self, url: str):
+        host = urlparse(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        async with limit:
+            yield
+
+    def enqueue(self, queue: asyncio.Queue, url: str, depth: int) -> None:
+        if url in self.seen:
+            return
+        if self.max_pages is not None and len(self.seen) >= self.max_pages:
+            return
+        self.seen.add(url)
+        queue.put_nowait((url, depth))
+
+    async def request(self, client: httpx.AsyncClient, url: str, headers: Dict[str, str]) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.host_limit(url):
+                    response = await client.get(url, headers=headers)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def fetch(self, client: httpx.AsyncClient, url: str) -> Optional[Dict[str, Any]]:
+        """Fetch one page, using cached content when the server reports it unchanged."""
+        cached = self.cache.get(url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            response = await self.request(client, url, headers)
+        except httpx.HTTPError as e:
+            print(f"Warning: failed to fetch {url}: {e}")
+            self.stats["errors"] += 1
+            return None
+
+        if response.status_code == 304 and cached:
+            self.stats["not_modified"] += 1
+            return cached
+        if response.status_code != 200:
+            print(f"Warning: {url} returned HTTP {response.status_code}")
+            self.stats["errors"] += 1
+            return None
+
+        content_type = response.headers.get("content-type", "").split(";")[0].strip()
+        self.stats["fetched"] += 1
+        self.stats["bytes"] += len(response.content)
+        if content_type in HTML_TYPES:
+            title, text, links, base = extract_html(response.text)
+            links = resolve_links(str(response.url), base, links)
+        elif content_type.startswith("text/"):
+            title, text, links = "", response.text, []
+        else:
+            self.stats["skipped"] += 1
+            return None
+
+        return {
+            "url": url,
+            "final_url": str(response.url),
+            "title": title,
+            "text": text,
+            "links": links,
+            "content_type": content_type,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": int(time.time()),
+        }
+
+    async def worker(self, client: httpx.AsyncClient, queue: asyncio.Queue) -> None:
+        while True:
+            url, depth = await queue.get()
+            try:
+                page = await self.fetch(client, url)
+                if page is not None:
+                    self.new_cache[url] = page
+                    if page["text"].strip():
+                        self.pages.append(page)
+                    if depth < self.depth:
+                        for link in page["links"]:
+                            if self.allowed(link):
+                                self.enqueue(queue, link, depth + 1)
+            except Exception as e:
+                # One bad page must not take the worker down with it
+                print(f"Warning: failed to crawl {url}: {e!r}")
+                self.stats["errors"] += 1
+            finally:
+                queue.task_done()
+
+    async def run(self) -> List[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        for url in self.seeds:
+            self.enqueue(queue, url, 0)
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(
+            limits=limits, timeout=self.timeout, follow_redirects=True, headers={"User-Agent": USER_AGENT}
+        ) as client:
+            workers = [asyncio.create_task(self.worker(client, queue)) for _ in range(self.concurrency)]
+            try:
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        return self.pages
+
+def crawl_source(source: Dict[str, Any], cache_dir: str) -> List[Dict[str, Any]]:
+    """Crawl a web source and return its pages ({url, title, text, ...})."""
+    cache_path = cache_path_for(source, cache_dir)
+    crawler = Crawler(source, load_cache(cache_path))
+
+    start = time.perf_counter()
+    pages = asyncio.run(crawler.run())
+    elapsed = time.perf_counter() - start
+
+    # Only pages seen this run are kept, so removed pages drop out of the cache
+    save_cache(cache_path, crawler.new_cache)
+    stats = crawler.stats
+    print(
+        f"Crawled {len(crawler.seen)} URLs in {elapsed:.1f}s "
+        f"({stats['fetched']} fetched, {stats['not_modified']} not modified, "
+        f"{stats['skipped']} skipped, {stats['errors']} errors, "
+        f"{len(crawler.seen) / max(elapsed, 1e-9):.1f} URLs/s)"
+    )
+    return pages
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl a web source and print extracted pages as JSON lines")
+    parser.add_argument("urls", nargs="+", help="Seed URLs")
+    parser.add_argument("--depth", type=int, default=1, help="Link depth to follow from the seeds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent requests")
+    parser.add_argument("--per-host", type=int, default=8, help="Concurrent requests per host")
+    parser.add_argument("--max-pages", type=int, help="Stop after this many URLs")
+    parser.add_argument("--cache-dir", default=".crawl-cache", help="Conditional request cache directory")
+    args = parser.parse_args()
+
+    source = {
+        "type": "web",
+        "urls": args.urls,
+        "depth": args.depth,
+        "concurrency": args.concurrency,
+        "per_host_concurrency": args.per_host,
+        "max_pages": args.max_pages,
+    }
+    # Keep stdout for the JSON lines
+    with redirect_stdout(sys.stderr):
+        pages = crawl_source(source, args.cache_dir)
+    for page in pages:
+        print(json.dumps({"url": page["url"], "title": page["title"], "text": page["text"]}))
+
+if __name__ == "__main__":
+    main()
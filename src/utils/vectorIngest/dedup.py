@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Exact and near-duplicate chunk detection for the vector ingestor.
+
+Runs over all chunks before embedding. Exact duplicates are found by a hash
+of the whitespace/case-normalized content. Near duplicates are found with
+MinHash signatures over word shingles, indexed by LSH banding; candidate
+pairs are confirmed by their estimated Jaccard similarity. Each duplicate is
+dropped and recorded as an alias in its canonical chunk's metadata, so the
+store and every query scan only pay for one vector per group.
+"""
+import hashlib
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+WHITESPACE = re.compile(r"\s+")
+
+def normalize(text: str) -> str:
+    """Collapse whitespace and case so formatting-only differences match exactly."""
+    return WHITESPACE.sub(" ", text).strip().lower()
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) whose LSH threshold (1/b)^(1/r) is closest to threshold."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        estimate = (1 / bands) ** (1 / rows)
+        if best is None or abs(estimate - threshold) < best[0]:
+            best = (abs(estimate - threshold), bands, rows)
+    return best[1], best[2]
+
+class MinHasher:
+    """MinHash signatures over word shingles, using universal hash permutations."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a < 2^31 and x < 2^32 keep a*x + b inside uint64 before the modulo
+        self.a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = text.split()
+        k = self.shingle_size
+        if len(words) <= k:
+            grams = [" ".join(words)]
+        else:
+            grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+        return np.unique(np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams)))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text)
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=1)
+
+class Deduplicator:
+    """Stream chunks through exact and near-duplicate detection."""
+
+    def __init__(self, exact: bool = True, near: bool = True, threshold: float = 0.85,
+                 num_perm: int = 128, shingle_size: int = 5):
+        self.exact = exact
+        self.near = near
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        self._by_hash: Dict[str, Dict[str, Any]] = {}
+        self._buckets: List[Dict[bytes, List[int]]] = [dict() for _ in range(self.bands)]
+        self._signatures: List[np.ndarray] = []
+        self._canonical: List[Dict[str, Any]] = []
+
+        self.stats = {"input_chunks": 0, "exact_duplicates": 0, "near_duplicates": 0,
+                      "input_chars": 0, "duplicate_chars": 0}
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _near_match(self, signature: np.ndarray) -> Tuple[Optional[int], float]:
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+        best, best_similarity = None, 0.0
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        return best, best_similarity
+
+    @staticmethod
+    def _alias(canonical: Dict[str, Any], duplicate: Dict[str, Any], kind: str, similarity: float) -> None:
+        metadata = duplicate.get("metadata", {})
+        alias = {"id": duplicate["id"], "kind": kind, "similarity": round(similarity, 4)}
+        for key in ("source", "path", "chunk_index"):
+            if key in metadata:
+                alias[key] = metadata[key]
+        canonical["metadata"].setdefault("aliases", []).append(alias)
+
+    def add(self, document: Dict[str, Any]) -> bool:
+        """Register a chunk; return True if it is kept (not a duplicate)."""
+        content = document["content"]
+        normalized = normalize(content)
+        self.stats["input_chunks"] += 1
+        self.stats["input_chars"] += len(content)
+
+        if self.exact:
+            digest = hashlib.sha1(normalized.encode()).hexdigest()
+            canonical = self._by_hash.get(digest)
+            if canonical is not None:
+                self._alias(canonical, document, "exact", 1.0)
+                self.stats["exact_duplicates"] += 1
+                self.stats["duplicate_chars"] += len(content)
+                return False
+
+        if self.near and normalized:
+            signature = self.hasher.signature(normalized)
+            match, similarity = self._near_match(signature)
+            if match is not None:
+                self._alias(self._canonical[match], document, "near", similarity)
+                self.stats["near_duplicates"] += 1
+                self.stats["duplicate_chars"] += len(content)
+                return False
+            index = len(self._signatures)
+            self._signatures.append(signature)
+            self._canonical.append(document)
+            for band, key in self._band_keys(signature):
+                self._buckets[band].setdefault(key, []).append(index)
+
+        if self.exact:
+            self._by_hash[digest] = document
+        return True
+
+    def report(self, dimensions: int = 0, bytes_per_document: float = 0.0) -> Dict[str, Any]:
+        """Summarize what deduplication saved, sizing skipped vectors and store files."""
+        removed = self.stats["exact_duplicates"] + self.stats["near_duplicates"]
+        input_chunks = self.stats["input_chunks"]
+        return {
+            **self.stats,
+            "kept_chunks": input_chunks - removed,
+            "removed_chunks": removed,
+            "threshold": self.threshold,
+            "lsh_bands": self.bands,
+            "lsh_rows": self.rows,
+            # Each removed chunk is one embedding forward pass and one stored vector
+            "embeddings_saved": removed,
+            "embedding_compute_saved_fraction": removed / input_chunks if input_chunks else 0.0,
+            "chars_saved_fraction": self.stats["duplicate_chars"] / self.stats["input_chars"] if self.stats["input_chars"] else 0.0,
+            "vector_bytes_saved": removed * dimensions * 4,
+            "store_bytes_saved": int(removed * bytes_per_document),
+        }
+
+def deduplicate(documents: List[Dict[str, Any]], processor: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Deduplicator]:
+    """Drop duplicate chunks, recording them as aliases on the kept chunk."""
+    deduplicator = Deduplicator(
+        exact=processor.get("exact", True),
+        near=processor.get("near", True),
+        threshold=processor.get("threshold", 0.85),
+        num_perm=processor.get("num_perm", 128),
+        shingle_size=processor.get("shingle_size", 5),
+    )
+    kept = [document for document in documents if deduplicator.add(document)]
+    return kept, deduplicator
@@ -5,16 +5,63 @@ import sys
 import os
 import glob
 import hashlib
-import time
-from typing import List, Dict, Any, Optional
+import zlib
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(UTILS_DIR, "instrumentation"))
+
+from splitters import create_splitter
+from dedup import deduplicate
+from sinks import LocalFilesSink, create_sinks
+from profiling import add_profile_arguments, phase, start_profiling
+
+# Documents serialized to estimate store size when no local sink reports it
+DEDUP_SIZE_SAMPLE = 100
+
 def load_config(config_file: str) -> Dict[str, Any]:
     """Load configuration from file."""
     with open(config_file, 'r') as f:
         return json.load(f)
 
-def process_file(file_path: str, processors: List[Dict[str, Any]]) -> Dict[str, Any]:
+@lru_cache(maxsize=None)
+def load_embedding_model(model_name: str):
+    """Load a SentenceTransformer model once per process."""
+    with phase("model_load"):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model_name: str) -> Tuple[Any, Optional[int]]:
+    """Return a model's tokenizer and max sequence length, or (None, None) if it cannot be loaded."""
+    try:
+        model = load_embedding_model(model_name)
+    except ImportError:
+        # Splitting works without the model; token mode and embed_documents warn
+        return None, None
+    except OSError as e:
+        # e.g. offline with no cached model: fall back to splitting without a tokenizer
+        print(f"Warning: could not load tokenizer for {model_name}: {e}")
+        return None, None
+    return model.tokenizer, model.max_seq_length
+
+def splitter_tokenizer(processor: Dict[str, Any], embedder_config: Optional[Dict[str, Any]]) -> Tuple[Any, Optional[int]]:
+    """Return the embedder's tokenizer and max sequence length, so chunks fit the model.
+    
+    Without an embedder config there is no model to fit, so nothing is loaded.
+    Character-measured splitters only need the tokenizer for the max-length
+    check, which a processor can turn off with "max_length_check": false.
+    """
+    if embedder_config is None or embedder_config.get("type", "sentence-transformers") != "sentence-transformers":
+        return None, None
+    measure_tokens = processor.get("splitter") == "tokens" or processor.get("length") == "tokens"
+    if not measure_tokens and not processor.get("max_length_check", True):
+        return None, None
+    return load_tokenizer(embedder_config.get("model", "all-MiniLM-L6-v2"))
+
+def process_file(file_path: str, processors: List[Dict[str, Any]], embedder_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Process a file through the processing pipeline."""
     # Read file content
     with open(file_path, 'r', encoding='utf-8') as f:
@@ -33,6 +80,26 @@ def process_file(file_path: str, processors: List[Dict[str, Any]]) -> Dict[str,
         "modified": os.path.getmtime(file_path)
     }
     
+    return process_content(content, doc_id, metadata, processors, embedder_config)
+
+def process_page(page: Dict[str, Any], processors: List[Dict[str, Any]], embedder_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Process a crawled web page through the processing pipeline."""
+    doc_id = hashlib.md5(page["url"].encode()).hexdigest()
+    metadata = {
+        "source": page["url"],
+        "path": page["url"],
+        "title": page["title"],
+        "content_type": page["content_type"],
+        "size": len(page["text"]),
+        "fetched": page["fetched_at"]
+    }
+    if page.get("last_modified"):
+        metadata["last_modified"] = page["last_modified"]
+    
+    return process_content(page["text"], doc_id, metadata, processors, embedder_config)
+
+def process_content(content: str, doc_id: str, metadata: Dict[str, Any], processors: List[Dict[str, Any]], embedder_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Apply processors to a document's text, returning its chunks."""
     # Apply processors
     processed_content = content
     for processor in processors:
@@ -40,33 +107,8 @@ def process_file(file_path: str, processors: List[Dict[str, Any]]) -> Dict[str,
         
         if processor_type == "text_splitter":
             # Split text into chunks
-            chunk_size = processor.get("chunk_size", 1000)
-            chunk_overlap = processor.get("chunk_overlap", 200)
-            # Simple implementation - split by newlines then recombine
-            lines = processed_content.split('\n')
-            chunks = []
-            current_chunk = []
-            current_size = 0
-            
-            for line in lines:
-                line_size = len(line)
-                if current_size + line_size > chunk_size and current_chunk:
-                    chunks.append('\n'.join(current_chunk))
-                    # Keep overlap
-                    overlap_size = 0
-                    overlap_chunk = []
-                    while current_chunk and overlap_size < chunk_overlap:
-                        line = current_chunk.pop()
-                        overlap_chunk.insert(0, line)
-                        overlap_size += len(line)
-                    current_chunk = overlap_chunk
-                    current_size = overlap_size
-                
-                current_chunk.append(line)
-                current_size += line_size
-            
-            if current_chunk:
-                chunks.append('\n'.join(current_chunk))
+            splitter = create_splitter(processor, *splitter_tokenizer(processor, embedder_config))
+            chunks = splitter.split_text(processed_content)
             
             # Create multiple documents
             return {
@@ -101,32 +143,57 @@ def process_file(file_path: str, processors: List[Dict[str, Any]]) -> Dict[str,
         ]
     }
 
+class HashingEmbedder:
+    """Deterministic feature-hashing embedder with a SentenceTransformer-like encode().
+    
+    Needs no model download, so it is used for tests and benchmarks.
+    """
+    
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in text.lower().split():
+                h = zlib.crc32(token.encode())
+                embeddings[i, h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+def encode_documents(documents: List[Dict[str, Any]], model, batch_size: int) -> List[Dict[str, Any]]:
+    """Encode document contents in batches and attach the embeddings."""
+    # Prepare texts for embedding
+    texts = [doc["content"] for doc in documents]
+    
+    # Generate embeddings in batches
+    embeddings = []
+    for i in range(0, len(texts), batch_size):
+        batch_texts = texts[i:i+batch_size]
+        with phase("encode"):
+            batch_embeddings = model.encode(batch_texts)
+        embeddings.extend(batch_embeddings)
+    
+    # Add embeddings to documents
+    for i, doc in enumerate(documents):
+        doc["embedding"] = embeddings[i].tolist()
+    
+    return documents
+
 def embed_documents(documents: List[Dict[str, Any]], embedder_config: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Embed documents using the specified embedder."""
     embedder_type = embedder_config.get("type", "sentence-transformers")
     model_name = embedder_config.get("model", "all-MiniLM-L6-v2")
     batch_size = embedder_config.get("batch_size", 32)
     
+    if embedder_type == "hash":
+        model = HashingEmbedder(embedder_config.get("dimensions", 384))
+        return encode_documents(documents, model, batch_size)
+    
     if embedder_type == "sentence-transformers":
         try:
-            from sentence_transformers import SentenceTransformer
-            model = SentenceTransformer(model_name)
-            
-            # Prepare texts for embedding
-            texts = [doc["content"] for doc in documents]
-            
-            # Generate embeddings in batches
-            embeddings = []
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i:i+batch_size]
-                batch_embeddings = model.encode(batch_texts)
-                embeddings.extend(batch_embeddings)
-            
-            # Add embeddings to documents
-            for i, doc in enumerate(documents):
-                doc["embedding"] = embeddings[i].tolist()
-            
-            return documents
+            model = load_embedding_model(model_name)
+            return encode_documents(documents, model, batch_size)
         except ImportError:
             print("Warning: sentence-transformers package not available")
             # Fallback to random embeddings for testing
@@ -142,34 +209,42 @@ def embed_documents(documents: List[Dict[str, Any]], embedder_config: Dict[str,
 
 def save_vector_store(documents: List[Dict[str, Any]], output_dir: str, collection: str, embedder_config: Dict[str, Any]) -> None:
     """Save documents and embeddings to vector store."""
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Create index file
-    index = {
-        "collection": collection,
-        "created_at": int(time.time()),
-        "documents": [doc["id"] for doc in documents],
-        "dimensions": len(documents[0]["embedding"]) if documents else 0,
-        "embedder": embedder_config
-    }
-    
-    # Write index file
-    with open(os.path.join(output_dir, "index.json"), 'w') as f:
-        json.dump(index, f, indent=2)
+    LocalFilesSink({}, collection, embedder_config, output_dir).write(documents)
+
+def save_dedup_report(deduplicator, documents: List[Dict[str, Any]], output_dir: str,
+                      stored_bytes: Optional[int] = None) -> None:
+    """Write dedup_report.json next to the index and print what was saved.
     
-    # Write document files
-    for doc in documents:
-        with open(os.path.join(output_dir, f"{doc['id']}.json"), 'w') as f:
-            json.dump(doc, f, indent=2)
+    stored_bytes is what the local sink wrote for the documents; without a
+    local sink, the size is estimated from a sample of documents.
+    """
+    if stored_bytes is not None:
+        bytes_per_document = stored_bytes / len(documents)
+    else:
+        # HTTP sinks carry about the same payload as the local files
+        sample = documents[::max(1, len(documents) // DEDUP_SIZE_SAMPLE)]
+        bytes_per_document = sum(len(json.dumps(doc, indent=2)) for doc in sample) / len(sample)
+    report = deduplicator.report(
+        dimensions=len(documents[0]["embedding"]),
+        bytes_per_document=bytes_per_document,
+    )
+    with open(os.path.join(output_dir, "dedup_report.json"), 'w') as f:
+        json.dump(report, f, indent=2)
     
-    print(f"Saved {len(documents)} documents to {output_dir}")
+    print(
+        f"Dedup removed {report['removed_chunks']} of {report['input_chunks']} chunks "
+        f"({report['exact_duplicates']} exact, {report['near_duplicates']} near): "
+        f"{report['embedding_compute_saved_fraction']:.1%} embedding compute and "
+        f"~{report['store_bytes_saved'] / 1e6:.2f} MB of store saved"
+    )
 
 def main():
     parser = argparse.ArgumentParser(description="Vector ingestor")
     parser.add_argument("--config", required=True, help="Configuration file")
     parser.add_argument("--output-dir", required=True, help="Output directory")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    start_profiling(args, args.output_dir, output_is_dir=True)
     
     # Load configuration
     config = load_config(args.config)
@@ -196,27 +271,55 @@ def main():
                 
                 for file_path in files:
                     print(f"Processing file: {file_path}")
-                    result = process_file(file_path, config.get("processors", []))
+                    with phase("chunk"):
+                        result = process_file(file_path, config.get("processors", []), config.get("embedder", {}))
                     all_documents.extend(result["chunks"])
         
         elif source_type == "web":
-            # Process web sources
-            # This is a placeholder - in a real implementation, 
-            # you would crawl web pages and extract content
-            print(f"Web source processing not implemented: {source}")
+            # Crawl web sources; validators are cached between runs
+            try:
+                from crawler import crawl_source
+            except ImportError:
+                print("Warning: httpx package not available, skipping web source")
+                continue
+            
+            cache_dir = source.get("cache_dir", os.path.join(args.output_dir, ".crawl-cache"))
+            with phase("crawl"):
+                pages = crawl_source(source, cache_dir)
+            for page in pages:
+                with phase("chunk"):
+                    result = process_page(page, config.get("processors", []), config.get("embedder", {}))
+                all_documents.extend(result["chunks"])
+    
+    # Drop duplicate chunks before paying to embed and store them
+    deduplicator = None
+    for processor in config.get("processors", []):
+        if processor.get("type") == "dedup" and all_documents:
+            with phase("dedup"):
+                all_documents, deduplicator = deduplicate(all_documents, processor)
     
     # Embed documents
     if all_documents:
         print(f"Embedding {len(all_documents)} documents...")
-        embedded_documents = embed_documents(all_documents, config.get("embedder", {}))
+        with phase("embed"):
+            embedded_documents = embed_documents(all_documents, config.get("embedder", {}))
         
-        # Save to vector store
-        save_vector_store(
-            embedded_documents, 
-            args.output_dir, 
+        # Write to each configured sink (local files by default)
+        sinks = create_sinks(
+            config.get("sinks"),
+            args.output_dir,
             config.get("collection", "default"),
             config.get("embedder", {})
         )
+        for sink in sinks:
+            with phase("write"):
+                sink.write(embedded_documents)
+        
+        if deduplicator is not None:
+            os.makedirs(args.output_dir, exist_ok=True)
+            local = [sink for sink in sinks if isinstance(sink, LocalFilesSink)]
+            save_dedup_report(deduplicator, embedded_documents, args.output_dir,
+                              local[0].document_bytes if local else None)
     else:
         print("No documents found to process")
 
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Destinations for embedded documents produced by the vector ingestor.
+
+Sinks are configured with the ingestor's "sinks" list (default: one local
+sink). The local sink writes the JSON files read by the vector search
+service. HTTP sinks upsert into Qdrant or Weaviate compatible APIs. They
+send batches over one pooled client and keep up to max_in_flight batches in
+flight. Batches are produced through a bounded queue, so serialization
+waits for the network instead of buffering the whole store. Point ids are
+UUIDv5s of the document ids, so retried batches and re-runs overwrite
+points instead of duplicating them.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+import json
+import os
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def point_id(doc_id: str) -> str:
+    """Deterministic UUID for a document id, so upserts are idempotent."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, doc_id))
+
+class Sink(ABC):
+    """Write a collection's embedded documents somewhere."""
+
+    def __init__(self, config: Dict[str, Any], collection: str, embedder_config: Dict[str, Any]):
+        self.config = config
+        self.collection = collection
+        self.embedder_config = embedder_config
+
+    @abstractmethod
+    def write(self, documents: List[Dict[str, Any]]) -> None:
+        """Store the documents (with their embeddings)."""
+
+class LocalFilesSink(Sink):
+    """index.json plus one JSON file per document, as read by the search service."""
+
+    def __init__(self, config: Dict[str, Any], collection: str, embedder_config: Dict[str, Any], output_dir: str):
+        super().__init__(config, collection, embedder_config)
+        self.output_dir = config.get("path", output_dir)
+        # Bytes of document files written by the last write()
+        self.document_bytes = 0
+
+    def write(self, documents: List[Dict[str, Any]]) -> None:
+        # Create output directory if it doesn't exist
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # Create index file
+        index = {
+            "collection": self.collection,
+            "created_at": int(time.time()),
+            "documents": [doc["id"] for doc in documents],
+            "dimensions": len(documents[0]["embedding"]) if documents else 0,
+            "embedder": self.embedder_config
+        }
+
+        # Write index file
+        with open(os.path.join(self.output_dir, "index.json"), 'w') as f:
+            json.dump(index, f, indent=2)
+
+        # Write document files
+        self.document_bytes = 0
+        for doc in documents:
+            with open(os.path.join(self.output_dir, f"{doc['id']}.json"), 'w') as f:
+                json.dump(doc, f, indent=2)
+                self.document_bytes += f.tell()
+
+        print(f"Saved {len(documents)} documents to {self.output_dir}")
+
+class HttpSink(Sink):
+    """Batched, concurrent, retried upserts over a pooled HTTP client.
+
+    Subclasses set default_url and implement batch_request().
+    """
+
+    default_url: str
+
+    def __init__(self, config: Dict[str, Any], collection: str, embedder_config: Dict[str, Any]):
+        super().__init__(config, collection, embedder_config)
+        self.url = config.get("url", self.default_url).rstrip("/")
+        self.batch_size = config.get("batch_size", 256)
+        self.max_in_flight = config.get("max_in_flight", 4)
+        self.retries = config.get("retries", 3)
+        self.timeout = config.get("timeout", 60)
+        # Read the key from the environment so it never lands in the Nix store
+        api_key_env = config.get("api_key_env")
+        self.api_key = os.environ.get(api_key_env) if api_key_env else None
+        self.stats = {"documents": 0, "batches": 0, "retries": 0}
+
+    def headers(self) -> Dict[str, str]:
+        return {}
+
+    async def ensure_collection(self, client, dimensions: int) -> None:
+        """Create the target collection if it does not exist."""
+
+    @abstractmethod
+    def batch_request(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return httpx request arguments (method, url, json) for one batch."""
+
+    def check_response(self, response) -> None:
+        response.raise_for_status()
+
+    async def send(self, client, request: Dict[str, Any], size: int) -> None:
+        import httpx
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await client.request(**request)
+                if response.status_code not in RETRY_STATUSES:
+                    self.check_response(response)
+                    self.stats["documents"] += size
+                    self.stats["batches"] += 1
+                    return
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = repr(e)
+            if attempt == self.retries:
+                raise RuntimeError(f"Batch upsert to {self.url} failed after {attempt + 1} attempts: {error}")
+            self.stats["retries"] += 1
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def sender(self, client, queue: asyncio.Queue, errors: List[Exception]) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            # After a failure keep draining so the producer never blocks forever
+            if errors:
+                continue
+            try:
+                await self.send(client, *item)
+            except Exception as e:
+                errors.append(e)
+
+    async def write_async(self, documents: List[Dict[str, Any]]) -> None:
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+        async with httpx.AsyncClient(
+            base_url=self.url, limits=limits, timeout=self.timeout, headers=self.headers()
+        ) as client:
+            await self.ensure_collection(client, len(documents[0]["embedding"]))
+
+            # A bounded queue is the backpressure: at most max_in_flight
+            # batches are being sent and at most max_in_flight more are waiting
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_in_flight)
+            errors: List[Exception] = []
+            senders = [asyncio.create_task(self.sender(client, queue, errors)) for _ in range(self.max_in_flight)]
+            for start in range(0, len(documents), self.batch_size):
+                batch = documents[start:start + self.batch_size]
+                await queue.put((self.batch_request(batch), len(batch)))
+                if errors:
+                    break
+            for _ in senders:
+                await queue.put(None)
+            await asyncio.gather(*senders)
+            if errors:
+                raise errors[0]
+
+    def write(self, documents: List[Dict[str, Any]]) -> None:
+        if not documents:
+            return
+        # Report this write only, not everything the sink has sent so far
+        self.stats = {"documents": 0, "batches": 0, "retries": 0}
+        start = time.perf_counter()
+        asyncio.run(self.write_async(documents))
+        elapsed = time.perf_counter() - start
+        print(
+            f"Upserted {self.stats['documents']} documents to {self.url} in {elapsed:.1f}s "
+            f"({self.stats['batches']} batches, {self.stats['retries']} retries, "
+            f"{self.stats['documents'] / max(elapsed, 1e-9):.0f} documents/s)"
+        )
+
+class QdrantSink(HttpSink):
+    """Upsert points through Qdrant's REST API."""
+
+    default_url = "http://localhost:6333"
+
+    def headers(self) -> Dict[str, str]:
+        return {"api-key": self.api_key} if self.api_key else {}
+
+    async def ensure_collection(self, client, dimensions: int) -> None:
+        response = await client.get(f"/collections/{self.collection}")
+        if response.status_code == 404:
+            response = await client.put(f"/collections/{self.collection}", json={
+                "vectors": {"size": dimensions, "distance": self.config.get("distance", "Cosine")}
+            })
+        response.raise_for_status()
+
+    def batch_request(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        points = [
+            {
+                "id": point_id(doc["id"]),
+                "vector": doc["embedding"],
+                "payload": {**doc.get("metadata", {}), "doc_id": doc["id"], "content": doc["content"]},
+            }
+            for doc in documents
+        ]
+        return {
+            "method": "PUT",
+            "url": f"/collections/{self.collection}/points",
+            "params": {"wait": "true"},
+            "json": {"points": points},
+        }
+
+class WeaviateSink(HttpSink):
+    """Upsert objects through Weaviate's batch REST API."""
+
+    default_url = "http://localhost:8080"
+
+    def __init__(self, config: Dict[str, Any], collection: str, embedder_config: Dict[str, Any]):
+        super().__init__(config, collection, embedder_config)
+        # Weaviate class names must start with an upper-case letter
+        name = "".join(part[:1].upper() + part[1:] for part in collection.replace("-", "_").split("_"))
+        self.class_name = config.get("class", name)
+
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    async def ensure_collection(self, client, dimensions: int) -> None:
+        response = await client.get(f"/v1/schema/{self.class_name}")
+        if response.status_code == 404:
+            response = await client.post("/v1/schema", json={"class": self.class_name, "vectorizer": "none"})
+        response.raise_for_status()
+
+    @staticmethod
+    def properties(doc: Dict[str, Any]) -> Dict[str, Any]:
+        properties = {"docId": doc["id"], "content": doc["content"]}
+        for key, value in doc.get("metadata", {}).items():
+            # Nested values (e.g. dedup aliases) are stored as JSON text
+            properties[key] = value if isinstance(value, (str, int, float, bool)) else json.dumps(value)
+        return properties
+
+    def batch_request(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        objects = [
+            {
+                "class": self.class_name,
+                "id": point_id(doc["id"]),
+                "vector": doc["embedding"],
+                "properties": self.properties(doc),
+            }
+            for doc in documents
+        ]
+        return {"method": "POST", "url": "/v1/batch/objects", "json": {"objects": objects}}
+
+    def check_response(self, response) -> None:
+        response.raise_for_status()
+        # Batch requests return 200 with per-object errors
+        for result in response.json():
+            errors = (result.get("result") or {}).get("errors")
+            if errors:
+                raise ValueError(f"Weaviate rejected object {result.get('id')}: {errors}")
+
+SINK_TYPES = {"qdrant": QdrantSink, "weaviate": WeaviateSink}
+
+def create_sinks(configs: Optional[List[Dict[str, Any]]], output_dir: str, collection: str,
+                 embedder_config: Dict[str, Any]) -> List[Sink]:
+    """Build the configured sinks; with none configured, write local files."""
+    sinks = []
+    for config in configs or [{"type": "local"}]:
+        sink_type = config.get("type", "local")
+        if sink_type == "local":
+            sinks.append(LocalFilesSink(config, collection, embedder_config, output_dir))
+        elif sink_type in SINK_TYPES:
+            sinks.append(SINK_TYPES[sink_type](config, collection, embedder_config))
+        else:
+            raise ValueError(f"Unsupported sink type: {sink_type}")
+    return sinks
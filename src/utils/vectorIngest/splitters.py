@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Text splitters used by the vector ingestor's text_splitter processor.
+
+Every splitter takes a text and returns a list of chunk strings. Sizes are
+measured with a length function (characters by default, or model tokens when
+a tokenizer is supplied), so chunks can be kept under the embedder's maximum
+sequence length.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+# Fallback tokenization when no model tokenizer is available
+WORD_PATTERN = re.compile(r"\S+\s*")
+
+def token_length_function(tokenizer) -> Callable[[str], int]:
+    """Return a length function counting model tokens (without special tokens)."""
+    def length(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return length
+
+def hard_split(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Split text into fixed-size character windows."""
+    step = max(chunk_size - chunk_overlap, 1)
+    return [text[i:i + chunk_size] for i in range(0, max(len(text) - chunk_overlap, 1), step)]
+
+class LineSplitter:
+    """Sliding-window splitter that packs whole lines into chunks.
+
+    The window is tracked by indices into the line list, so building the
+    overlap for the next chunk never copies or re-inserts lines. Lines longer
+    than chunk_size are hard-split so no chunk exceeds the limit.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 length_function: Callable[[str], int] = len):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_function = length_function
+
+    def _lines(self, text: str):
+        oversized = None
+        for line in text.split('\n'):
+            size = self.length_function(line)
+            if size <= self.chunk_size:
+                yield line, size
+                continue
+            # Break a single over-long line at word boundaries instead
+            if oversized is None:
+                oversized = RecursiveSplitter(self.chunk_size, 0, [" ", ""], self.length_function)
+            for piece in oversized.split_text(line):
+                yield piece, self.length_function(piece)
+
+    def split_text(self, text: str) -> List[str]:
+        # Each stored size includes the newline that joins it to the next line
+        separator_size = self.length_function('\n')
+        lines = []
+        sizes = []
+        chunks = []
+        start = 0
+        current_size = 0
+
+        for line, line_size in self._lines(text):
+            if current_size + line_size > self.chunk_size and len(lines) > start:
+                chunks.append('\n'.join(lines[start:]))
+                # Walk back from the end of the window to keep the overlap,
+                # always dropping at least one line so the window advances
+                new_start = len(lines)
+                overlap_size = 0
+                while new_start - 1 > start and overlap_size < self.chunk_overlap:
+                    new_start -= 1
+                    overlap_size += sizes[new_start]
+                # Drop overlap lines that would push the next chunk over the limit
+                while new_start < len(lines) and overlap_size + line_size > self.chunk_size:
+                    overlap_size -= sizes[new_start]
+                    new_start += 1
+                start = new_start
+                current_size = overlap_size
+            lines.append(line)
+            sizes.append(line_size + separator_size)
+            current_size += line_size + separator_size
+
+        if len(lines) > start:
+            chunks.append('\n'.join(lines[start:]))
+        return chunks
+
+class RecursiveSplitter:
+    """Split on the coarsest separator that yields pieces under chunk_size.
+
+    Pieces that are still too large are split again with the next separator;
+    the empty separator falls back to fixed-size character windows.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 separators: Optional[List[str]] = None,
+                 length_function: Callable[[str], int] = len):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or DEFAULT_SEPARATORS
+        self.length_function = length_function
+
+    def _merge(self, splits: List[str], separator: str) -> List[str]:
+        """Greedily pack small splits into chunks, carrying an overlap tail."""
+        separator_size = self.length_function(separator)
+        chunks = []
+        window = deque()
+        total = 0
+
+        for split in splits:
+            size = self.length_function(split)
+            joined = separator_size if window else 0
+            if total + size + joined > self.chunk_size and window:
+                chunks.append(separator.join(window))
+                # Shrink from the left until the tail fits the overlap budget
+                # and leaves room for the incoming split
+                while window and (total > self.chunk_overlap or
+                                  total + size + separator_size > self.chunk_size):
+                    total -= self.length_function(window.popleft())
+                    if window:
+                        total -= separator_size
+            window.append(split)
+            total += size + (separator_size if len(window) > 1 else 0)
+
+        if window:
+            chunks.append(separator.join(window))
+        return chunks
+
+    def _split(self, text: str, separators: List[str]) -> List[str]:
+        # Pick the first separator present in the text
+        separator = separators[-1]
+        remaining = []
+        for i, candidate in enumerate(separators):
+            if candidate == "" or candidate in text:
+                separator = candidate
+                remaining = separators[i + 1:]
+                break
+
+        if separator == "":
+            if self.length_function is len:
+                return hard_split(text, self.chunk_size, self.chunk_overlap)
+            splits = list(text)
+        else:
+            splits = text.split(separator)
+
+        chunks = []
+        pending = []
+        for split in splits:
+            if self.length_function(split) <= self.chunk_size:
+                pending.append(split)
+                continue
+            if pending:
+                chunks.extend(self._merge(pending, separator))
+                pending = []
+            if remaining:
+                chunks.extend(self._split(split, remaining))
+            else:
+                chunks.append(split)
+        if pending:
+            chunks.extend(self._merge(pending, separator))
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk for chunk in self._split(text, self.separators) if chunk.strip()]
+
+class TokenSplitter:
+    """Split text into windows of model tokens.
+
+    The text is tokenized once and chunks are cut from the original string
+    using the tokenizer's character offsets, so no decode round-trip is needed.
+    Without a tokenizer, whitespace-delimited words are used as tokens.
+    """
+
+    def __init__(self, chunk_size: int = 256, chunk_overlap: int = 32, tokenizer=None):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.tokenizer = tokenizer
+
+    def _offsets(self, text: str) -> List[tuple]:
+        if self.tokenizer is None:
+            return [match.span() for match in WORD_PATTERN.finditer(text)]
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True,
+                                  return_attention_mask=False, verbose=False)
+        return encoding["offset_mapping"]
+
+    def _split_ids(self, text: str) -> List[str]:
+        # Slow tokenizers cannot report offsets, so decode each window instead
+        ids = self.tokenizer.encode(text, add_special_tokens=False)
+        step = self.chunk_size - self.chunk_overlap
+        return [
+            self.tokenizer.decode(ids[start:start + self.chunk_size])
+            for start in range(0, max(len(ids) - self.chunk_overlap, 1), step)
+        ]
+
+    def split_text(self, text: str) -> List[str]:
+        if self.tokenizer is not None and not getattr(self.tokenizer, "is_fast", True):
+            return self._split_ids(text)
+        offsets = self._offsets(text)
+        if not offsets:
+            return [text] if text.strip() else []
+
+        chunks = []
+        step = self.chunk_size - self.chunk_overlap
+        for start in range(0, len(offsets), step):
+            end = min(start + self.chunk_size, len(offsets))
+            chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
+            if end == len(offsets):
+                break
+        return chunks
+
+class MaxLengthGuard:
+    """Re-split chunks of a character-measured splitter that exceed the model's token limit.
+
+    Character sizes say little about token counts (code, URLs and non-Latin
+    text tokenize densely), so each chunk is checked against the tokenizer
+    and any over-long one is split into token windows instead of being
+    silently truncated by the embedder.
+    """
+
+    def __init__(self, splitter, tokenizer, limit: int):
+        self.splitter = splitter
+        self.tokenizer = tokenizer
+        self.limit = limit
+        self.fallback = TokenSplitter(limit, 0, tokenizer)
+
+    def split_text(self, text: str) -> List[str]:
+        chunks = []
+        resplit = 0
+        for chunk in self.splitter.split_text(text):
+            if len(self.tokenizer.encode(chunk, add_special_tokens=False)) <= self.limit:
+                chunks.append(chunk)
+            else:
+                resplit += 1
+                chunks.extend(self.fallback.split_text(chunk))
+        if resplit:
+            print(f"Warning: {resplit} chunks exceeded the model max sequence length ({self.limit} tokens) and were re-split")
+        return chunks
+
+def create_splitter(processor: Dict[str, Any], tokenizer=None, max_seq_length: Optional[int] = None):
+    """Create a splitter from a text_splitter processor config.
+
+    processor["splitter"] selects "lines" (default), "recursive" or "tokens".
+    processor["length"] = "tokens" measures line/recursive chunks in model
+    tokens. Token-measured chunk sizes are capped at max_seq_length minus the
+    tokenizer's special tokens, and character-measured chunks are re-split
+    when they exceed it, so the embedder never truncates a chunk.
+    """
+    splitter_type = processor.get("splitter", "lines")
+    measure_tokens = splitter_type == "tokens" or processor.get("length") == "tokens"
+
+    chunk_size = processor.get("chunk_size", max_seq_length if measure_tokens and max_seq_length else 1000)
+    chunk_overlap = processor.get("chunk_overlap", 200)
+
+    limit = None
+    if max_seq_length:
+        special_tokens = tokenizer.num_special_tokens_to_add() if tokenizer is not None else 0
+        limit = max_seq_length - special_tokens
+    if measure_tokens and limit:
+        if chunk_size > limit:
+            print(f"Warning: chunk_size {chunk_size} exceeds model max sequence length, using {limit} tokens")
+            chunk_size = limit
+    if chunk_overlap > chunk_size // 2:
+        # The default overlap of 200 does not fit small chunk sizes
+        print(f"Warning: chunk_overlap {chunk_overlap} is too large for chunk_size {chunk_size}, using {chunk_size // 2}")
+        chunk_overlap = chunk_size // 2
+
+    if splitter_type == "tokens":
+        return TokenSplitter(chunk_size, chunk_overlap, tokenizer)
+
+    length_function = len
+    if measure_tokens:
+        if tokenizer is None:
+            print("Warning: no tokenizer available, measuring chunks in words")
+            length_function = lambda text: len(WORD_PATTERN.findall(text))
+        else:
+            length_function = token_length_function(tokenizer)
+
+    if splitter_type == "recursive":
+        splitter = RecursiveSplitter(chunk_size, chunk_overlap, processor.get("separators"), length_function)
+    elif splitter_type == "lines":
+        splitter = LineSplitter(chunk_size, chunk_overlap, length_function)
+    else:
+        raise ValueError(f"Unsupported splitter: {splitter_type}")
+
+    if not measure_tokens and tokenizer is not None and limit:
+        return MaxLengthGuard(splitter, tokenizer, limit)
+    return splitter
+
+def benchmark(files: List[str], processors: List[Dict[str, Any]], repeat: int = 3) -> List[Dict[str, Any]]:
+    """Time each splitter config over the given files and report throughput."""
+    texts = []
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    total_chars = sum(len(text) for text in texts)
+
+    results = []
+    for processor in processors:
+        splitter = create_splitter(processor)
+        best = float("inf")
+        chunk_count = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            chunk_count = sum(len(splitter.split_text(text)) for text in texts)
+            best = min(best, time.perf_counter() - start)
+        results.append({
+            "processor": processor,
+            "chunks": chunk_count,
+            "chars": total_chars,
+            "seconds": best,
+            "mb_per_second": total_chars / best / 1e6 if best > 0 else None,
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text splitters on large files")
+    parser.add_argument("files", nargs="+", help="Text files to split")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Chunk size")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Chunk overlap")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per splitter (best time is reported)")
+    args = parser.parse_args()
+
+    processors = [
+        {"splitter": splitter, "chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap}
+        for splitter in ("lines", "recursive")
+    ]
+    json.dump(benchmark(args.files, processors, args.repeat), sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
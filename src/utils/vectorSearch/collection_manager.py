@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Lazy loading and memory-budgeted eviction of vector collections.
+
+Used by the vector search service when it serves several collections from
+one process. Collection matrices are loaded on first use. Least recently used
+idle collections are evicted once the resident size exceeds the memory
+budget. Embedding models are shared per model name and never evicted.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+def object_bytes(value: Any) -> int:
+    """Approximate deep size of parsed JSON (dicts, lists and scalars)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(object_bytes(key) + object_bytes(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(object_bytes(item) for item in value)
+    return size
+
+def estimate_store_bytes(vector_store: Dict[str, Any]) -> int:
+    """Approximate resident size of a loaded store.
+
+    Counts the matrix plus the Python objects behind every document (the
+    dict, id, content and metadata) and the index, so collections with
+    many small chunks or large metadata are not undercounted.
+    """
+    document_bytes = sys.getsizeof(vector_store["documents"])
+    document_bytes += sum(object_bytes(doc) for doc in vector_store["documents"])
+    return vector_store["vectors"].nbytes + document_bytes + object_bytes(vector_store["index"])
+
+class EmbedderPool:
+    """Load each embedding model once and share it between collections."""
+
+    def __init__(self, loader: Callable[[Dict[str, Any]], Any]):
+        self.loader = loader
+        self._models: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, embedder_config: Dict[str, Any]):
+        key = (embedder_config.get("type", "sentence-transformers"), embedder_config.get("model", "all-MiniLM-L6-v2"))
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = self.loader(embedder_config)
+            return self._models[key]
+
+    def names(self):
+        with self._lock:
+            return [f"{kind}:{model}" for kind, model in self._models]
+
+class CollectionManager:
+    """Serve many collections from one process under a RAM budget."""
+
+    def __init__(self, collections: Dict[str, Dict[str, Any]],
+                 store_loader: Callable[[str], Dict[str, Any]],
+                 embedders: EmbedderPool,
+                 memory_budget_bytes: Optional[int] = None,
+                 default_embedder: Optional[Dict[str, Any]] = None,
+                 metrics=None):
+        self.collections = collections
+        self.store_loader = store_loader
+        self.embedders = embedders
+        self.memory_budget_bytes = memory_budget_bytes
+        self.default_embedder = default_embedder or {}
+        self.metrics = metrics
+
+        # name -> (vector_store, model, bytes), most recently used last
+        self._loaded: "OrderedDict[str, Tuple[Dict[str, Any], Any, int]]" = OrderedDict()
+        self._active: Dict[str, int] = {name: 0 for name in collections}
+        self._load_locks = {name: threading.Lock() for name in collections}
+        self._lock = threading.Lock()
+        self.stats = {
+            name: {"loads": 0, "evictions": 0, "last_load_seconds": None, "queries": 0,
+                   "query_seconds": 0.0, "last_used": None}
+            for name in collections
+        }
+
+    def _load(self, name: str) -> Tuple[Dict[str, Any], Any, int]:
+        config = self.collections[name]
+        start = time.perf_counter()
+        vector_store = self.store_loader(config["vectorDir"])
+        embedder_config = config.get("embedder") or vector_store["index"].get("embedder") or self.default_embedder
+        model = self.embedders.get(embedder_config)
+        elapsed = time.perf_counter() - start
+
+        size = estimate_store_bytes(vector_store)
+        self.stats[name]["loads"] += 1
+        self.stats[name]["last_load_seconds"] = elapsed
+        if self.metrics is not None:
+            self.metrics.collection_loads.inc(name)
+            self.metrics.store_documents.set(name, value=len(vector_store["documents"]))
+            self.metrics.store_bytes.set(name, value=vector_store["vectors"].nbytes)
+        print(f"Loaded collection {name}: {len(vector_store['documents'])} documents, {size / 1e6:.1f} MB in {elapsed:.2f}s")
+        return vector_store, model, size
+
+    def _evict(self, keep: str) -> None:
+        """Evict least recently used idle collections until within budget (caller holds _lock)."""
+        if self.memory_budget_bytes is None:
+            return
+        resident = sum(entry[2] for entry in self._loaded.values())
+        for name in list(self._loaded):
+            if resident <= self.memory_budget_bytes:
+                break
+            if name == keep or self._active[name] > 0:
+                continue
+            resident -= self._loaded.pop(name)[2]
+            self.stats[name]["evictions"] += 1
+            if self.metrics is not None:
+                self.metrics.collection_evictions.inc(name)
+                self.metrics.store_documents.set(name, value=0)
+                self.metrics.store_bytes.set(name, value=0)
+            print(f"Evicted collection {name} to stay within memory budget")
+
+    def _ensure_loaded(self, name: str) -> Tuple[Dict[str, Any], Any, int]:
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None:
+                self._loaded.move_to_end(name)
+                return entry
+        # Per-collection lock: concurrent first queries load only once,
+        # while other collections keep serving
+        with self._load_locks[name]:
+            with self._lock:
+                entry = self._loaded.get(name)
+            if entry is None:
+                entry = self._load(name)
+                with self._lock:
+                    self._loaded[name] = entry
+                    self._evict(keep=name)
+        return entry
+
+    def preload(self) -> None:
+        """Load every collection now (e.g. before forking workers), subject to the budget."""
+        for name in self.collections:
+            self._ensure_loaded(name)
+
+    @contextmanager
+    def acquire(self, name: str):
+        """Yield (vector_store, model) for a collection, loading it if needed.
+
+        A collection is never evicted while it is acquired.
+        """
+        if name not in self.collections:
+            raise KeyError(name)
+
+        with self._lock:
+            self._active[name] += 1
+        try:
+            entry = self._ensure_loaded(name)
+            start = time.perf_counter()
+            try:
+                yield entry[0], entry[1]
+            finally:
+                with self._lock:
+                    stats = self.stats[name]
+                    stats["queries"] += 1
+                    stats["query_seconds"] += time.perf_counter() - start
+                    stats["last_used"] = time.time()
+                if self.metrics is not None:
+                    self.metrics.collection_queries.inc(name)
+        finally:
+            with self._lock:
+                self._active[name] -= 1
+
+    def info(self) -> Dict[str, Any]:
+        """Collections and stats of this process; with pre-forked workers, /metrics has the totals."""
+        with self._lock:
+            loaded = {name: entry for name, entry in self._loaded.items()}
+        collections = {}
+        for name, config in self.collections.items():
+            stats = self.stats[name]
+            entry = loaded.get(name)
+            collections[name] = {
+                "vector_dir": config["vectorDir"],
+                "loaded": entry is not None,
+                "count": len(entry[0]["documents"]) if entry else None,
+                "dimensions": entry[0]["index"].get("dimensions", 0) if entry else None,
+                "resident_bytes": entry[2] if entry else 0,
+                **stats,
+                "mean_query_seconds": stats["query_seconds"] / stats["queries"] if stats["queries"] else None,
+            }
+        return {
+            "worker": os.getpid(),
+            "collections": collections,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "resident_bytes": sum(entry[2] for entry in loaded.values()),
+            "embedders": self.embedders.names(),
+        }
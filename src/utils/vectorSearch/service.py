@@ -4,21 +4,88 @@ import json
 import sys
 import os
 import glob
+import base64
+import binascii
 import numpy as np
-from typing import List, Dict, Any, Optional
+from contextlib import nullcontext
+from typing import List, Dict, Any, Optional, Tuple, Callable
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+try:
+    import orjson
+    
+    class FastJSONResponse(JSONResponse):
+        """JSON response rendered with orjson, several times faster than the stdlib encoder."""
+        
+        def render(self, content: Any) -> bytes:
+            return orjson.dumps(content)
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(UTILS_DIR, "instrumentation"))
+sys.path.insert(0, os.path.join(UTILS_DIR, "serving"))
+from metrics import instrument_app, stage
+from prefork import serve_prefork
+from collection_manager import CollectionManager, EmbedderPool
+
+RESULT_FIELDS = ("id", "score", "content", "metadata")
+
 class QueryInput(BaseModel):
     query: str
     top_k: int = 5
     filter: Optional[Dict[str, Any]] = None
+    fields: Optional[List[str]] = None
 
 class QueryByVectorInput(BaseModel):
-    vector: List[float]
+    # Either a JSON float list, or base64 of little-endian float32 bytes
+    # (much cheaper to validate for large vectors)
+    vector: Optional[List[float]] = None
+    vector_b64: Optional[str] = None
     top_k: int = 5
     filter: Optional[Dict[str, Any]] = None
+    fields: Optional[List[str]] = None
+
+def decode_vector(data: bytes) -> np.ndarray:
+    """Interpret raw bytes as a little-endian float32 vector without copying."""
+    if len(data) == 0 or len(data) % 4:
+        raise HTTPException(status_code=400, detail="Vector bytes must be a non-empty multiple of 4 (float32)")
+    return np.frombuffer(data, dtype="<f4")
+
+def query_vector_from_input(input_data: QueryByVectorInput) -> np.ndarray:
+    """Extract the query vector from either the list or base64 form."""
+    if (input_data.vector is None) == (input_data.vector_b64 is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'vector' or 'vector_b64'")
+    if input_data.vector_b64 is not None:
+        try:
+            return decode_vector(base64.b64decode(input_data.vector_b64, validate=True))
+        except binascii.Error:
+            raise HTTPException(status_code=400, detail="'vector_b64' is not valid base64")
+    return np.array(input_data.vector, dtype=np.float32)
+
+def validate_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """Check requested result fields; None means all fields."""
+    if fields is None:
+        return None
+    unknown = [field for field in fields if field not in RESULT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown result fields: {unknown}; expected a subset of {list(RESULT_FIELDS)}")
+    return fields
+
+def validate_query(vector_store: Dict[str, Any], query_vector: np.ndarray, filter_dict: Any) -> None:
+    """Reject query vectors that are the wrong dimension, zero or non-finite, and non-object filters, as client errors."""
+    vectors = vector_store["vectors"]
+    if vectors.ndim == 2 and query_vector.shape != (vectors.shape[1],):
+        raise HTTPException(status_code=400, detail=f"Query vector has {query_vector.size} dimensions; the store has {vectors.shape[1]}")
+    if not np.all(np.isfinite(query_vector)):
+        raise HTTPException(status_code=400, detail="Query vector contains NaN or infinite values")
+    if not np.any(query_vector):
+        raise HTTPException(status_code=400, detail="Query vector is all zeros")
+    if filter_dict is not None and not isinstance(filter_dict, dict):
+        raise HTTPException(status_code=400, detail="'filter' must be a JSON object")
 
 def load_vector_store(vector_dir: str) -> Dict[str, Any]:
     """Load vector store from directory."""
@@ -52,85 +119,149 @@ def load_vector_store(vector_dir: str) -> Dict[str, Any]:
         "vectors": np.array(vectors, dtype=np.float32)
     }
 
-def create_app(vector_store: Dict[str, Any], embedder_config: Dict[str, Any]):
-    app = FastAPI(
-        title="Vector Search Service",
-        description="API for semantic search using vector embeddings",
-        version="1.0.0"
-    )
+def search_vectors(vector_store: Dict[str, Any], query_vector: np.ndarray, top_k: int, filter_dict: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Return the top_k documents most similar to query_vector.
     
-    # Load embedder model
+    fields restricts each result to the given keys (default: all of RESULT_FIELDS).
+    """
+    # Normalize query vector
+    query_vector = query_vector / np.linalg.norm(query_vector)
+    
+    # Calculate cosine similarities
+    with stage("score"):
+        similarities = np.dot(vector_store["vectors"], query_vector)
+    
+    # Get top k results
+    with stage("top-k"):
+        top_k = min(top_k, len(vector_store["documents"]))
+        top_indices = np.argsort(similarities)[::-1][:top_k]
+    
+    # Apply filter if provided
+    if filter_dict:
+        with stage("filter"):
+            filtered_indices = []
+            for idx in top_indices:
+                doc = vector_store["documents"][idx]
+                if matches_filter(doc, filter_dict):
+                    filtered_indices.append(idx)
+            top_indices = filtered_indices[:top_k]
+    
+    # Format results
+    results = []
+    for idx in top_indices:
+        doc = vector_store["documents"][idx]
+        if fields is None:
+            results.append({
+                "id": doc["id"],
+                "content": doc["content"],
+                "metadata": doc["metadata"],
+                "score": float(similarities[idx])
+            })
+        else:
+            results.append({
+                field: float(similarities[idx]) if field == "score" else doc[field]
+                for field in fields
+            })
+    
+    return results
+
+def load_embedder(embedder_config: Dict[str, Any], metrics=None):
+    """Load the query embedding model, or None if it is unavailable."""
     embedder_type = embedder_config.get("type", "sentence-transformers")
     model_name = embedder_config.get("model", "all-MiniLM-L6-v2")
     
     if embedder_type == "sentence-transformers":
         try:
             from sentence_transformers import SentenceTransformer
-            model = SentenceTransformer(model_name)
+            with metrics.time_model_load(model_name) if metrics else nullcontext():
+                return SentenceTransformer(model_name)
         except ImportError:
             print("Warning: sentence-transformers package not available")
-            model = None
+            return None
     else:
         print(f"Warning: Unsupported embedder type: {embedder_type}")
-        model = None
+        return None
+
+def add_search_routes(app: FastAPI, prefix: str, resolve: Callable):
+    """Register the search endpoints under prefix.
+    
+    resolve is a FastAPI dependency yielding (vector_store, model) for the request.
+    """
+    def respond(vector_store: Dict[str, Any], query_vector: np.ndarray, top_k: int, filter_dict: Optional[Dict[str, Any]], fields: Optional[List[str]]):
+        validate_query(vector_store, query_vector, filter_dict)
+        results = search_vectors(vector_store, query_vector, top_k, filter_dict, fields)
+        with stage("serialize"):
+            return FastJSONResponse({"results": results})
     
-    @app.post("/search")
-    async def search(input_data: QueryInput):
+    @app.post(f"{prefix}/search")
+    async def search(input_data: QueryInput, target: Tuple[Dict[str, Any], Any] = Depends(resolve)):
+        vector_store, model = target
         try:
             if model is None:
                 raise HTTPException(status_code=500, detail="Embedding model not available")
+            fields = validate_fields(input_data.fields)
             
             # Encode query
-            query_embedding = model.encode(input_data.query)
+            with stage("encode"):
+                query_embedding = model.encode(input_data.query)
             
-            # Search
-            return await search_by_vector(QueryByVectorInput(
-                vector=query_embedding.tolist(),
-                top_k=input_data.top_k,
-                filter=input_data.filter
-            ))
+            # Search with the embedding directly, no list round-trip
+            return respond(vector_store, np.asarray(query_embedding, dtype=np.float32), input_data.top_k, input_data.filter, fields)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
-    @app.post("/search-by-vector")
-    async def search_by_vector(input_data: QueryByVectorInput):
+    @app.post(f"{prefix}/search-by-vector")
+    async def search_by_vector(input_data: QueryByVectorInput, target: Tuple[Dict[str, Any], Any] = Depends(resolve)):
+        vector_store, _ = target
         try:
-            # Convert query vector to numpy array
-            query_vector = np.array(input_data.vector, dtype=np.float32)
-            
-            # Normalize query vector
-            query_vector = query_vector / np.linalg.norm(query_vector)
-            
-            # Calculate cosine similarities
-            similarities = np.dot(vector_store["vectors"], query_vector)
-            
-            # Get top k results
-            top_k = min(input_data.top_k, len(vector_store["documents"]))
-            top_indices = np.argsort(similarities)[::-1][:top_k]
-            
-            # Apply filter if provided
-            if input_data.filter:
-                filtered_indices = []
-                for idx in top_indices:
-                    doc = vector_store["documents"][idx]
-                    if matches_filter(doc, input_data.filter):
-                        filtered_indices.append(idx)
-                top_indices = filtered_indices[:top_k]
-            
-            # Format results
-            results = []
-            for idx in top_indices:
-                doc = vector_store["documents"][idx]
-                results.append({
-                    "id": doc["id"],
-                    "content": doc["content"],
-                    "metadata": doc["metadata"],
-                    "score": float(similarities[idx])
-                })
-            
-            return {"results": results}
+            query_vector = query_vector_from_input(input_data)
+            fields = validate_fields(input_data.fields)
+            return respond(vector_store, query_vector, input_data.top_k, input_data.filter, fields)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    @app.post(f"{prefix}/search-by-vector/raw")
+    async def search_by_raw_vector(request: Request, top_k: int = 5, fields: Optional[str] = None, filter: Optional[str] = None,
+                                   target: Tuple[Dict[str, Any], Any] = Depends(resolve)):
+        """Search with the request body as raw little-endian float32 bytes.
+        
+        fields is comma-separated (e.g. "id,score"); filter is a JSON object.
+        """
+        vector_store, _ = target
+        try:
+            query_vector = decode_vector(await request.body())
+            field_list = validate_fields(fields.split(",") if fields else None)
+            try:
+                filter_dict = json.loads(filter) if filter else None
+            except json.JSONDecodeError:
+                raise HTTPException(status_code=400, detail="'filter' must be a JSON object")
+            return respond(vector_store, query_vector, top_k, filter_dict, field_list)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
+
+def create_app(vector_store: Dict[str, Any], embedder_config: Dict[str, Any], server_timing: bool = False):
+    app = FastAPI(
+        title="Vector Search Service",
+        description="API for semantic search using vector embeddings",
+        version="1.0.0"
+    )
+    
+    # Request metrics and per-stage timings on /metrics
+    metrics = instrument_app(app, "vectorSearch", server_timing=server_timing)
+    collection = vector_store["index"].get("collection", "default")
+    metrics.store_documents.set(collection, value=len(vector_store["documents"]))
+    metrics.store_bytes.set(collection, value=vector_store["vectors"].nbytes)
+    
+    # Load embedder model
+    model = load_embedder(embedder_config, metrics)
+    
+    add_search_routes(app, "", lambda: (vector_store, model))
     
     @app.get("/info")
     async def get_info():
@@ -148,6 +279,67 @@ def create_app(vector_store: Dict[str, Any], embedder_config: Dict[str, Any]):
     
     return app
 
+def create_collections_app(collections: Dict[str, Dict[str, Any]], default_embedder: Dict[str, Any],
+                           memory_budget_bytes: Optional[int] = None, server_timing: bool = False):
+    """Serve many collections under /collections/{name}/..., loaded lazily."""
+    app = FastAPI(
+        title="Vector Search Service",
+        description="API for semantic search over multiple vector collections",
+        version="1.0.0"
+    )
+    
+    metrics = instrument_app(app, "vectorSearch", server_timing=server_timing)
+    manager = CollectionManager(
+        collections,
+        store_loader=load_vector_store,
+        embedders=EmbedderPool(lambda config: load_embedder(config, metrics)),
+        memory_budget_bytes=memory_budget_bytes,
+        default_embedder=default_embedder,
+        metrics=metrics,
+    )
+    
+    def resolve(name: str):
+        if name not in collections:
+            raise HTTPException(status_code=404, detail=f"Unknown collection: {name}")
+        with manager.acquire(name) as target:
+            yield target
+    
+    add_search_routes(app, "/collections/{name}", resolve)
+    
+    @app.get("/collections")
+    async def list_collections():
+        return {"collections": list(collections)}
+    
+    @app.get("/info")
+    async def get_info():
+        return manager.info()
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+    
+    app.state.collections = manager
+    return app
+
+def run_server(app, host: str, port: int, workers: int) -> None:
+    """Run the app in-process, or pre-forked so workers share loaded memory."""
+    print(f"Starting vector search service on {host}:{port}")
+    if workers > 1:
+        serve_prefork(app, host, port, workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
+
+def load_collections_config(config_file: str) -> Dict[str, Any]:
+    """Load a {"collections": {name: {"vectorDir": ..., "embedder": {...}}}, "memoryBudgetMB": ...} file."""
+    with open(config_file, 'r') as f:
+        config = json.load(f)
+    collections = config.get("collections", {})
+    # Also accept a list of {"name": ..., "vectorDir": ...} entries
+    if isinstance(collections, list):
+        collections = {entry["name"]: entry for entry in collections}
+    config["collections"] = collections
+    return config
+
 def matches_filter(doc: Dict[str, Any], filter_dict: Dict[str, Any]) -> bool:
     """Check if document matches the filter criteria."""
     for key, value in filter_dict.items():
@@ -164,29 +356,55 @@ def matches_filter(doc: Dict[str, Any], filter_dict: Dict[str, Any]) -> bool:
 
 def main():
     parser = argparse.ArgumentParser(description="Vector search service")
-    parser.add_argument("--vector-dir", required=True, help="Vector directory")
+    parser.add_argument("--vector-dir", help="Vector directory (single-collection mode)")
+    parser.add_argument("--collections", help="JSON file describing several collections to serve")
+    parser.add_argument("--memory-budget-mb", type=float, help="RAM budget for loaded collections (overrides the collections file)")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind")
     parser.add_argument("--embedder-model", default="all-MiniLM-L6-v2", help="Embedder model name")
+    parser.add_argument("--server-timing", action="store_true", help="Add per-stage Server-Timing response headers")
+    parser.add_argument("--workers", type=int, default=1, help="Pre-forked worker processes sharing the loaded model and vectors")
+    parser.add_argument("--preload", action="store_true", help="Load all collections at startup (useful with --workers)")
     args = parser.parse_args()
     
+    if bool(args.vector_dir) == bool(args.collections):
+        parser.error("exactly one of --vector-dir or --collections is required")
+    
+    default_embedder = {
+        "type": "sentence-transformers",
+        "model": args.embedder_model
+    }
+    
+    if args.collections:
+        config = load_collections_config(args.collections)
+        budget_mb = args.memory_budget_mb if args.memory_budget_mb is not None else config.get("memoryBudgetMB")
+        app = create_collections_app(
+            config["collections"],
+            default_embedder,
+            memory_budget_bytes=int(budget_mb * 1024 * 1024) if budget_mb else None,
+            server_timing=args.server_timing
+        )
+        if args.preload:
+            # Loaded before forking, so workers share the matrices
+            app.state.collections.preload()
+        else:
+            print(f"Serving {len(config['collections'])} collections (loaded on first query)")
+        run_server(app, args.host, args.port, args.workers)
+        return
+    
     # Load vector store
     print(f"Loading vector store from {args.vector_dir}...")
     vector_store = load_vector_store(args.vector_dir)
     print(f"Loaded {len(vector_store['documents'])} documents with {vector_store['index'].get('dimensions', 0)} dimensions")
     
     # Get embedder config from index
-    embedder_config = vector_store["index"].get("embedder", {
-        "type": "sentence-transformers",
-        "model": args.embedder_model
-    })
+    embedder_config = vector_store["index"].get("embedder", default_embedder)
     
     # Create FastAPI app
-    app = create_app(vector_store, embedder_config)
+    app = create_app(vector_store, embedder_config, server_timing=args.server_timing)
     
     # Run server
-    print(f"Starting vector search service on {args.host}:{args.port}")
-    uvicorn.run(app, host=args.host, port=args.port)
+    run_server(app, args.host, args.port, args.workers)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file